@@ -0,0 +1,167 @@
+from evaluator import (
+    CARD_KEYS, SUIT_BASE, SUIT_SHIFT, RANK_BITS, FLUSH_BITS,
+    FLUSH_TABLE, OFFSETS, RANK_TABLE, hole_cards,
+)
+from tables import CATEGORY_SHIFT, BUCKETS, TABLE_MASK
+from board import Board
+from game import check_players
+from hand import Hand
+import numpy as np
+
+
+# ----------------------------------------------------------------------------
+
+# Same tables as evaluator.strength, just seen through NumPy.
+# frombuffer does not copy, so the mapped file is still shared.
+KEYS = np.array(CARD_KEYS, dtype=np.uint64)
+FLUSHES = np.frombuffer(FLUSH_TABLE, dtype=np.uint32)
+BUCKET_OFFSETS = np.frombuffer(OFFSETS, dtype=np.uint32)
+STRENGTHS = np.frombuffer(RANK_TABLE, dtype=np.uint32)
+
+# shifts to get the four suit nibbles out of a key.
+SUIT_NIBBLES = np.uint64(SUIT_SHIFT) + np.arange(4, dtype=np.uint64) * np.uint64(4)
+
+
+# ----------------------------------------------------------------------------
+
+
+def rank_keys(keys: np.ndarray, codes: np.ndarray, common: list[int] = []) -> np.ndarray:
+    """
+    Strengths for already summed hand keys (SUIT_BASE included).
+    codes are the matching (N, cards) code rows, common the codes that belong
+    to every row on top of them. Both are only read for flushes.
+    """
+    # the rank part fits 32 bits, for every row, flushes get overwritten later.
+    ranks = (keys & np.uint64(RANK_BITS)).astype(np.uint32)
+    slots = (ranks + BUCKET_OFFSETS[ranks % np.uint32(BUCKETS)]) & np.uint32(TABLE_MASK)
+    strengths = STRENGTHS[slots]
+
+    # a suit nibble reaching 8 means five cards of that suit.
+    flush = (keys & np.uint64(FLUSH_BITS)) != 0
+
+    if flush.any():
+        rows = np.asarray(codes[flush], dtype=np.intp)
+        nibbles = (keys[flush, None] >> SUIT_NIBBLES) & np.uint64(15)
+        suit = (nibbles >= 8).argmax(axis=1)
+        bits = np.where((rows & 3) == suit[:, None], 1 << (rows >> 2), 0)
+        masks = np.bitwise_or.reduce(bits, axis=1)
+        for code in common:
+            masks |= np.where((code & 3) == suit, 1 << (code >> 2), 0)
+        strengths[flush] = FLUSHES[masks]
+
+    return strengths
+
+
+def evaluate_batch(codes: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Ranks every row of an (N, 5 to 7) array of card codes at once.
+    Returns an (N,) array of strengths and an (N,) array of Result values.
+    """
+    codes = np.asarray(codes, dtype=np.intp)
+    assert codes.ndim == 2 and 5 <= codes.shape[1] <= 7
+
+    keys = KEYS[codes].sum(axis=1, dtype=np.uint64) + np.uint64(SUIT_BASE)
+    strengths = rank_keys(keys, codes)
+
+    return (strengths, (strengths >> CATEGORY_SHIFT).astype(np.uint8))
+
+
+def evaluate_boards(boards: np.ndarray, hands: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Same as evaluate_batch, with the board codes (N, 3 to 5) and the hole
+    card codes (N, 2) given as separate arrays.
+    """
+    return evaluate_batch(np.concatenate((np.asarray(boards), np.asarray(hands)), axis=1))
+
+
+# ----------------------------------------------------------------------------
+
+
+def encode_deal(board: Board, hands: list[Hand]) -> np.ndarray:
+    """
+    Turns the board and hands of one game() into a (players, 7) code array,
+    ready for evaluate_batch.
+    """
+    b = [card.index for card in board.cards]
+    return np.array([b + [card.index for card in hole_cards(hand)] for hand in hands], dtype=np.int64)
+
+
+# Deals are made this many at a time, to keep the decks small in memory.
+DEAL_BLOCK = 1 << 16
+
+
+def shuffle_prefix(deck: np.ndarray, rows: int, count: int, rng: np.random.Generator) -> np.ndarray:
+    """
+    rows independent random draws of count cards out of deck, as a
+    (rows, count) array. Like the Deck, only the drawn cards get shuffled,
+    with one Fisher-Yates step per card for all rows at once.
+    """
+    size = len(deck)
+    cards = np.tile(np.asarray(deck, dtype=np.int16), (rows, 1))
+    draws = rng.random((count, rows))
+    index = np.arange(rows)
+
+    for i in range(count):
+        # swap a random card of the rest into place i.
+        pick = i + (draws[i] * (size - i)).astype(np.intp)
+        card = cards[index, pick]
+        cards[index, pick] = cards[:, i]
+        cards[:, i] = card
+
+    return cards[:, :count]
+
+
+def deal_games(games: int, players: int, rng: np.random.Generator | None = None) -> tuple[np.ndarray, np.ndarray]:
+    """
+    games deals of game(players) at once, as codes: the boards (N, 5) and
+    the hole cards (N, players, 2). The decks are shuffled with
+    shuffle_prefix and the cards are taken in the order game() deals them,
+    burning a card before the hands, the flop, the turn and the river.
+    """
+    check_players(players)
+    rng = rng or np.random.default_rng()
+    hands = 2 * players
+    deck = np.arange(52, dtype=np.int16)
+
+    boards = np.empty((games, 5), dtype=np.int16)
+    holes = np.empty((games, players, 2), dtype=np.int16)
+
+    for start in range(0, games, DEAL_BLOCK):
+        rows = min(DEAL_BLOCK, games - start)
+        cards = shuffle_prefix(deck, rows, hands + 9, rng)
+
+        # 0 burn, hands, burn, 3 flop, burn, turn, burn, river.
+        holes[start:start + rows] = cards[:, 1:1 + hands].reshape(rows, players, 2)
+        boards[start:start + rows, :3] = cards[:, hands + 2:hands + 5]
+        boards[start:start + rows, 3] = cards[:, hands + 6]
+        boards[start:start + rows, 4] = cards[:, hands + 8]
+
+    return (boards, holes)
+
+
+def deal_strengths(boards: np.ndarray, holes: np.ndarray) -> np.ndarray:
+    """
+    Strength of every player of deal_games, as a (N, players) array.
+    """
+    (games, players, _) = holes.shape
+    (strengths, _) = evaluate_boards(np.repeat(boards, players, axis=0), holes.reshape(-1, 2))
+    return strengths.reshape(games, players)
+
+
+def combinations(n: int, k: int) -> np.ndarray:
+    """
+    All k out of n index combinations as a (C(n, k), k) array, in the same
+    order as itertools.combinations, without a Python loop per combination.
+    """
+    combos = np.zeros((1, 0), dtype=np.int16)
+    last = np.full(1, -1)
+
+    for _ in range(k):
+        # every combination gets extended by every index above its last one.
+        counts = n - 1 - last
+        rows = np.repeat(np.arange(len(combos)), counts)
+        starts = np.cumsum(counts) - counts
+        last = np.arange(len(rows)) - np.repeat(starts - last - 1, counts)
+        combos = np.column_stack((combos[rows], last.astype(np.int16)))
+
+    return combos
@@ -0,0 +1,173 @@
+from game import game, MAX_PLAYERS, legacy_evaluate, sort_cards, check_straight, check_flush
+from deck import Deck
+from evaluator import strength, evaluate, evaluate_strength
+from simulate import Stats, play
+from itertools import cycle
+import argparse
+import json
+import platform
+import random
+import subprocess
+import time
+import tracemalloc
+
+
+# ----------------------------------------------------------------------------
+
+# Table sizes for the game benchmarks.
+PLAYER_COUNTS = [2, 6, 9, MAX_PLAYERS]
+
+
+def measure(function, min_time: float, repeat: int = 3) -> float:
+    """
+    Calls function until min_time is over, repeat times, and returns the
+    best number of calls per second.
+    """
+    best = 0.0
+    for _ in range(repeat):
+        calls = 0
+        start = time.perf_counter()
+        elapsed = 0.0
+        while elapsed < min_time:
+            for _ in range(100):
+                function()
+            calls += 100
+            elapsed = time.perf_counter() - start
+        best = max(best, calls / elapsed)
+
+    return best
+
+
+def game_memory(players: int, games: int = 50) -> float:
+    """
+    Average peak of newly allocated bytes while playing and ranking one game.
+    """
+    deck = Deck()
+    stats = Stats()
+    total = 0
+    for _ in range(games):
+        tracemalloc.start()
+        play(players, stats, deck)
+        total += tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+
+    return total / games
+
+
+def revision() -> str:
+    try:
+        return subprocess.run(["git", "rev-parse", "HEAD"], capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+# ----------------------------------------------------------------------------
+
+
+def cases() -> dict[str, tuple[str, object]]:
+    """
+    All benchmarks by name, as (unit, function to call once).
+    """
+    random.seed(0)
+    hands = [random.sample(range(52), 7) for _ in range(1000)]
+    deals = [game(9) for _ in range(200)]
+    deck = Deck()
+    stats = Stats()
+
+    # the prepared inputs get handed out round robin.
+    next_hand = cycle(hands).__next__
+    next_deal = cycle([(board, hand) for board, hs in deals for hand in hs]).__next__
+    next_cards = cycle([board.cards + list(hand) for board, hs in deals for hand in hs]).__next__
+
+    def legacy():
+        legacy_evaluate(*next_deal())
+
+    def deal_hand():
+        deck.reset()
+        for _ in range(17):
+            deck.deal()
+
+    res: dict[str, tuple[str, object]] = {
+        "strength": ("hands", lambda: strength(next_hand())),
+        "evaluate_strength": ("hands", lambda: evaluate_strength(*next_deal())),
+        "evaluate": ("hands", lambda: evaluate(*next_deal())),
+        "legacy_evaluate": ("hands", legacy),
+        "sort_cards": ("calls", lambda: sort_cards(next_cards())),
+        "check_straight": ("calls", lambda: check_straight(next_cards())),
+        "check_flush": ("calls", lambda: check_flush(next_cards())),
+        "deck_deal_17": ("deals of 17 cards", deal_hand),
+    }
+
+    for players in PLAYER_COUNTS:
+        res[f"game_{players}"] = ("deals", lambda players=players: game(players, deck))
+        res[f"full_game_{players}"] = ("games", lambda players=players: play(players, stats, deck))
+
+    return res
+
+
+def run(min_time: float) -> dict:
+    """
+    Runs every benchmark and returns the results, ready to dump as JSON.
+    A benchmark that raises is kept with its error instead of a speed.
+    """
+    results = {}
+    for name, (unit, function) in cases().items():
+        try:
+            results[name] = {"unit": f"{unit}/s", "per_second": measure(function, min_time)}
+        except Exception as error:
+            results[name] = {"unit": f"{unit}/s", "error": repr(error)}
+
+    try:
+        import batch
+        import numpy as np
+        codes = np.random.default_rng(0).permuted(np.tile(np.arange(52), (100000, 1)), axis=1)[:, :7]
+        rate = measure(lambda: batch.evaluate_batch(codes), min_time / 10, 1) * len(codes)
+        results["evaluate_batch"] = {"unit": "hands/s", "per_second": rate}
+    except ImportError as error:
+        results["evaluate_batch"] = {"unit": "hands/s", "error": repr(error)}
+
+    for players in PLAYER_COUNTS:
+        results[f"memory_{players}"] = {"unit": "bytes/game", "value": game_memory(players)}
+
+    return {
+        "revision": revision(),
+        "python": platform.python_version(),
+        "machine": platform.machine(),
+        "time": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "results": results,
+    }
+
+
+def compare(old: dict, new: dict):
+    """
+    Prints new against old, a ratio above 1 is faster (or smaller).
+    """
+    for name, result in new["results"].items():
+        before = old["results"].get(name, {})
+        for key in ("per_second", "value"):
+            if key in result and key in before and result[key] and before[key]:
+                ratio = result[key] / before[key] if key == "per_second" else before[key] / result[key]
+                print(f"{name:24} {before[key]:14.1f} -> {result[key]:14.1f}  x{ratio:.2f}")
+
+
+# ----------------------------------------------------------------------------
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmarks the evaluators, the deck and whole games.")
+    parser.add_argument("--out", default="bench.json", help="where to write the JSON results")
+    parser.add_argument("--min-time", type=float, default=0.5, help="seconds per measurement")
+    parser.add_argument("--compare", help="earlier results to compare against")
+    args = parser.parse_args()
+
+    report = run(args.min_time)
+    with open(args.out, "w") as f:
+        json.dump(report, f, indent=2)
+
+    for name, result in report["results"].items():
+        value = result.get("per_second", result.get("value"))
+        print(f"{name:24} {result['error'] if 'error' in result else f'{value:14.1f}'} {result['unit']}")
+
+    if args.compare:
+        with open(args.compare) as f:
+            compare(json.load(f), report)
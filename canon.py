@@ -0,0 +1,116 @@
+from card import Cards, CARDS, SUITS
+from card_types import Symbols
+from board import Board
+from hand import Hand
+from evaluator import hole_cards
+from itertools import combinations, permutations
+
+
+# ----------------------------------------------------------------------------
+
+# Suits have no order in poker, so renaming them gives the same situation.
+# A permutation is a tuple with the new suit of every suit, PERMUTATIONS[0]
+# leaves everything as it is.
+PERMUTATIONS: list[tuple[int, ...]] = list(permutations(range(4)))
+PERM_INDEX: dict[tuple[int, ...], int] = {perm: i for i, perm in enumerate(PERMUTATIONS)}
+IDENTITY = PERMUTATIONS[0]
+
+# The new code of every card under every permutation.
+PERMUTED: list[list[int]] = [[code & ~3 | perm[code & 3] for code in range(52)] for perm in PERMUTATIONS]
+
+
+def inverse(perm: tuple[int, ...]) -> tuple[int, ...]:
+    """
+    The permutation that undoes perm.
+    """
+    res = [0] * 4
+    for suit, new in enumerate(perm):
+        res[new] = suit
+    return tuple(res)
+
+
+def permute(codes: list[int], perm: tuple[int, ...]) -> list[int]:
+    return [code & ~3 | perm[code & 3] for code in codes]
+
+
+def symbols(perm: tuple[int, ...]) -> dict[Symbols, Symbols]:
+    """
+    The permutation as a mapping between Symbols.
+    """
+    return {SUITS[suit]: SUITS[new] for suit, new in enumerate(perm)}
+
+
+# ----------------------------------------------------------------------------
+
+
+def canonical_board(board: list[int]) -> tuple[tuple[int, ...], tuple[int, ...]]:
+    """
+    The smallest sorted form of the board codes under all suit permutations,
+    together with the permutation that gives it. The order of the cards
+    doesn't matter, every board of the same class comes out the same.
+    """
+    best = None
+    best_perm = IDENTITY
+    for perm, table in zip(PERMUTATIONS, PERMUTED):
+        codes = tuple(sorted([table[code] for code in board]))
+        if best is None or codes < best:
+            best = codes
+            best_perm = perm
+
+    return (best, best_perm)
+
+
+def canonical_codes(
+    board: list[int], hands: list[list[int]], dead: list[int] = []
+) -> tuple[tuple[int, ...], tuple[tuple[int, ...], ...], tuple[int, ...], tuple[int, ...]]:
+    """
+    Canonical form of a whole situation: board and dead cards as sorted
+    sets, the hands in seat order with their two cards sorted. Returns
+    (board, hands, dead, perm), perm maps the original suits to the new ones.
+    Anything that only depends on the suits being different, like equities,
+    is the same for both forms and can be stored once.
+    """
+    best = None
+    best_perm = IDENTITY
+    for perm, table in zip(PERMUTATIONS, PERMUTED):
+        key = (
+            tuple(sorted([table[code] for code in board])),
+            tuple(tuple(sorted([table[code] for code in cards])) for cards in hands),
+            tuple(sorted([table[code] for code in dead])),
+        )
+        if best is None or key < best:
+            best = key
+            best_perm = perm
+
+    return best + (best_perm,)
+
+
+def canonical(board: Board | None, hands: list[Hand]) -> tuple[list[Cards], list[tuple[Cards, Cards]], tuple[int, ...]]:
+    """
+    canonical_codes for a Board (None preflop) and Hands, as Cards.
+    """
+    shown = [card.index for card in board.cards] if board else []
+    hole = [[card.index for card in hole_cards(hand)] for hand in hands]
+    (shown, hole, _, perm) = canonical_codes(shown, hole)
+
+    return ([CARDS[code] for code in shown], [(CARDS[a], CARDS[b]) for a, b in hole], perm)
+
+
+def restore(codes: list[int], perm: tuple[int, ...]) -> list[int]:
+    """
+    Maps canonical codes back to the original suits.
+    """
+    return permute(codes, inverse(perm))
+
+
+def canonical_flops() -> dict[tuple[int, ...], int]:
+    """
+    The 1755 distinct flops, each with the number of the 22100 flops it
+    stands for.
+    """
+    res: dict[tuple[int, ...], int] = {}
+    for flop in combinations(range(52), 3):
+        (key, _) = canonical_board(list(flop))
+        res[key] = res.get(key, 0) + 1
+
+    return res
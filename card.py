@@ -1,33 +1,117 @@
 from card_types import Values, Symbols
 
 
+# ----------------------------------------------------------------------------
+
+# Every card is encoded as one small integer: code = rank << 2 | suit.
+# rank goes from 0 (Two) to 12 (Ace), suit is the position in Symbols.
+# So all 52 cards are the numbers 0 to 51.
+
+RANKS: list[Values] = list(reversed(Values))  # Two ... Ace
+SUITS: list[Symbols] = list(Symbols)
+
+# Two has power 2, up to the Ace with 14.
+POWERS: dict[Values, int] = {value: rank + 2 for rank, value in enumerate(RANKS)}
+
+
+# ----------------------------------------------------------------------------
+
+
 class Cards:
-    def __init__(self, value: Values, symbol: Symbols):
-        self.value = value
-        self.symbol = symbol
-
-        self.power: int = 0
-        if self.value.value.isnumeric():
-            self.power = int(self.value.value)
-
-        else:
-            if self.value == Values.Jack:
-                self.power = 11
-            elif self.value == Values.Queen:
-                self.power = 12
-            elif self.value == Values.King:
-                self.power = 13
-            elif self.value == Values.Ace:
-                self.power = 14
-            else:
-                # only Dummy left:
-                self.power = 100
-
-        assert self.power != 0
-
-
-    def __leq__(self, other: "Cards") -> bool:
-        
+    """
+    One of the 52 cards. There is exactly one object per card, made at
+    import, so Cards(value, symbol) only looks it up. The objects are
+    immutable, hash by their code and compare by power.
+    """
+
+    __slots__ = ("value", "symbol", "power", "index")
+
+    def __new__(cls, value: Values, symbol: Symbols) -> "Cards":
+        return CARDS[CODES[(value, symbol)]]
+
+
+    @classmethod
+    def create(cls, value: Values, symbol: Symbols, index: int) -> "Cards":
+        """
+        Only used once per card, to fill CARDS.
+        """
+        card = object.__new__(cls)
+        object.__setattr__(card, "value", value)
+        object.__setattr__(card, "symbol", symbol)
+        object.__setattr__(card, "power", POWERS[value])
+        object.__setattr__(card, "index", index)
+        return card
+
+
+    def __setattr__(self, name: str, value):
+        raise AttributeError("Cards are immutable.")
+
+
+    def __delattr__(self, name: str):
+        raise AttributeError("Cards are immutable.")
+
+
+    def __reduce__(self):
+        # unpickling goes through __new__, so it gives back the shared card.
+        return (Cards, (self.value, self.symbol))
+
+
+    def __hash__(self) -> int:
+        return self.index
+
+
+    def __lt__(self, other: "Cards") -> bool:
+        if not isinstance(other, Cards):
+            return NotImplemented
+        return self.power < other.power
+
+
+    def __le__(self, other: "Cards") -> bool:
+        if not isinstance(other, Cards):
+            return NotImplemented
         return self.power <= other.power
-        
 
+
+    def __gt__(self, other: "Cards") -> bool:
+        if not isinstance(other, Cards):
+            return NotImplemented
+        return self.power > other.power
+
+
+    def __ge__(self, other: "Cards") -> bool:
+        if not isinstance(other, Cards):
+            return NotImplemented
+        return self.power >= other.power
+
+
+    def __repr__(self) -> str:
+        return f"Cards({self.value.name}, {self.symbol.name})"
+
+
+# ----------------------------------------------------------------------------
+
+
+# The shared Cards object of every code.
+CARDS: list[Cards] = [
+    Cards.create(value, symbol, rank << 2 | suit)
+    for rank, value in enumerate(RANKS)
+    for suit, symbol in enumerate(SUITS)
+]
+
+CODES: dict[tuple[Values, Symbols], int] = {
+    (card.value, card.symbol): card.index for card in CARDS
+}
+
+
+def encode(card: Cards) -> int:
+    """
+    Returns the integer code of a card.
+    """
+    return card.index
+
+
+def decode(code: int) -> Cards:
+    """
+    Returns the Cards object for the integer code.
+    """
+    return CARDS[code]
@@ -0,0 +1,159 @@
+from evaluator import SUIT_BASE
+from batch import KEYS, rank_keys, combinations
+from canon import PERMUTED, PERM_INDEX, IDENTITY, canonical_board
+from collections import OrderedDict
+import numpy as np
+
+
+# ----------------------------------------------------------------------------
+
+# All 1326 two card combinations of the deck, lower code first.
+COMBOS = combinations(52, 2).astype(np.intp)
+
+# Index of the combination of two codes, either order.
+COMBO_INDEX = np.full((52, 52), -1, dtype=np.intp)
+COMBO_INDEX[COMBOS[:, 0], COMBOS[:, 1]] = np.arange(len(COMBOS))
+COMBO_INDEX[COMBOS[:, 1], COMBOS[:, 0]] = np.arange(len(COMBOS))
+
+# The 51 combinations holding a card, for every card.
+CARD_COMBOS = np.sort(np.delete(COMBO_INDEX, np.arange(52) * 53).reshape(52, 51), axis=1)
+
+# Where every combination goes under every suit permutation.
+COMBO_PERMS = COMBO_INDEX[np.array(PERMUTED)[:, COMBOS[:, 0]], np.array(PERMUTED)[:, COMBOS[:, 1]]]
+
+# Key of the two hole cards of every combination.
+COMBO_KEYS = KEYS[COMBOS].sum(axis=1, dtype=np.uint64)
+
+
+# ----------------------------------------------------------------------------
+
+
+class BoardCache:
+    """
+    Least recently used strength arrays by board, bounded by max_bytes.
+    The arrays are read only, everybody gets the same one.
+    """
+
+    def __init__(self, max_bytes: int):
+        self.max_bytes = max_bytes
+        self.entries: OrderedDict[int, np.ndarray] = OrderedDict()
+        self.size = 0
+        self.hits = 0
+        self.misses = 0
+
+
+    def get(self, key: int) -> np.ndarray | None:
+        strengths = self.entries.get(key)
+        if strengths is None:
+            self.misses += 1
+            return None
+
+        self.hits += 1
+        self.entries.move_to_end(key)
+        return strengths
+
+
+    def put(self, key: int, strengths: np.ndarray):
+        strengths.setflags(write=False)
+        self.entries[key] = strengths
+        self.size += strengths.nbytes
+
+        while self.size > self.max_bytes and len(self.entries) > 1:
+            (_, oldest) = self.entries.popitem(last=False)
+            self.size -= oldest.nbytes
+
+
+    def clear(self):
+        self.entries.clear()
+        self.size = 0
+
+
+# 64 MB are about 12000 boards, boards are stored once per suit class.
+BOARDS = BoardCache(64 << 20)
+
+# The same arrays by the exact board, with the suits as they were asked
+# for. Looking one up costs only the 52 bit key, no canonical form.
+EXACT = BoardCache(32 << 20)
+
+# Exact keys of boards showdown() met once. A board is only computed for
+# the cache on its second showdown, most random boards never come back.
+SEEN: set[int] = set()
+MAX_SEEN = 1 << 16
+
+
+def board_key(board: list[int]) -> int:
+    """
+    The board as a 52 bit card set, the same for any order of the cards.
+    """
+    key = 0
+    for code in board:
+        key |= 1 << code
+
+    return key
+
+
+def compute_strengths(board: list[int]) -> np.ndarray:
+    """
+    Strength of every combination on a complete board of 5 codes.
+    Combinations using a board card are dead and get strength 0, which no
+    real hand has.
+    """
+    keys = COMBO_KEYS + np.uint64(SUIT_BASE + int(KEYS[board].sum()))
+    strengths = rank_keys(keys, COMBOS, board)
+    strengths[CARD_COMBOS[board].ravel()] = 0
+
+    return strengths
+
+
+def board_strengths(board: list[int], dead: list[int] = []) -> np.ndarray:
+    """
+    Strength of every combination on a complete board of 5 codes, from the
+    cache if the board or one with the suits renamed was seen before.
+    Combinations with a board or dead card have strength 0.
+    """
+    assert len(board) == 5
+
+    exact = board_key(board)
+    strengths = EXACT.get(exact)
+    if strengths is None:
+        (canon, perm) = canonical_board(board)
+        key = board_key(canon)
+        strengths = BOARDS.get(key)
+        if strengths is None:
+            strengths = compute_strengths(list(canon))
+            BOARDS.put(key, strengths)
+
+        if perm != IDENTITY:
+            # every combination reads the strength of its renamed twin.
+            strengths = strengths[COMBO_PERMS[PERM_INDEX[perm]]]
+        EXACT.put(exact, strengths)
+
+    if dead:
+        strengths = strengths.copy()
+        strengths[CARD_COMBOS[dead].ravel()] = 0
+
+    return strengths
+
+
+def cached_strengths(board: list[int]) -> np.ndarray | None:
+    """
+    The strength array of a board for showdown(), None if it is not worth
+    it. Only the exact board is looked up. A board seen for the second time
+    gets computed and cached, a first one is only remembered.
+    """
+    if len(board) != 5:
+        return None
+
+    key = board_key(board)
+    strengths = EXACT.get(key)
+    if strengths is not None:
+        return strengths
+
+    if key not in SEEN:
+        if len(SEEN) >= MAX_SEEN:
+            SEEN.clear()
+        SEEN.add(key)
+        return None
+
+    SEEN.discard(key)
+    return board_strengths(board)
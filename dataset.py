@@ -0,0 +1,241 @@
+from game import game, MAX_PLAYERS
+from deck import Deck
+from board import Board
+from hand import Hand
+from evaluator import evaluate_strength, hole_cards
+from tables import CATEGORY_SHIFT
+from streams import Stream, fresh_seed
+from array import array
+import mmap
+import os
+import struct
+import numpy as np
+
+
+# ----------------------------------------------------------------------------
+
+# A dataset file is a row of chunks, every chunk holds up to chunk_size deals
+# column by column, so a reader can map the file and look at single columns
+# without touching the rest:
+#
+#   header       magic, version, deals, players (rows of the player columns)
+#   strengths    uint32 per player
+#   boards       5 uint8 codes per deal
+#   seats        uint8 player count per deal
+#   holes        2 uint8 codes per player
+#   results      uint8 Result value per player
+#   winners      uint8 per player, 1 if the player won or split the pot
+#
+# followed by padding up to the next multiple of 8 bytes.
+MAGIC = b"DEAL"
+VERSION = 1
+HEADER = struct.Struct("<4sIII")
+
+
+def padding(size: int) -> int:
+    return -size % 8
+
+
+# ----------------------------------------------------------------------------
+
+
+class DealWriter:
+    """
+    Appends deals to a dataset file, one chunk per chunk_size deals.
+    Only the current chunk is kept in memory.
+    """
+
+    def __init__(self, path: str, chunk_size: int = 65536):
+        self.file = open(path, "ab")
+        self.chunk_size = chunk_size
+        self.clear()
+
+
+    def clear(self):
+        self.deals = 0
+        self.strengths = array("I")
+        self.boards = array("B")
+        self.seats = array("B")
+        self.holes = array("B")
+        self.winners = array("B")
+
+
+    def add(self, board: Board, hands: list[Hand], strengths: list[int] | None = None):
+        """
+        Adds one finished deal. The strengths are computed when not given.
+        """
+        assert len(board.cards) == 5
+
+        if strengths is None:
+            strengths = [evaluate_strength(board, hand) for hand in hands]
+        best = max(strengths)
+
+        self.boards.extend(card.index for card in board.cards)
+        self.seats.append(len(hands))
+        for hand, value in zip(hands, strengths):
+            self.holes.extend(card.index for card in hole_cards(hand))
+            self.strengths.append(value)
+            self.winners.append(value == best)
+
+        self.deals += 1
+        if self.deals >= self.chunk_size:
+            self.flush()
+
+
+    def flush(self):
+        """
+        Writes the deals collected so far as one chunk.
+        """
+        if self.deals == 0:
+            return
+
+        results = array("B", (value >> CATEGORY_SHIFT for value in self.strengths))
+        parts = [
+            HEADER.pack(MAGIC, VERSION, self.deals, len(self.strengths)),
+            self.strengths.tobytes(),
+            self.boards.tobytes(),
+            self.seats.tobytes(),
+            self.holes.tobytes(),
+            results.tobytes(),
+            self.winners.tobytes(),
+        ]
+        size = sum(len(part) for part in parts)
+        parts.append(bytes(padding(size)))
+
+        self.file.write(b"".join(parts))
+        self.clear()
+
+
+    def close(self):
+        self.flush()
+        self.file.close()
+
+
+    def __enter__(self) -> "DealWriter":
+        return self
+
+
+    def __exit__(self, *args):
+        self.close()
+
+
+# ----------------------------------------------------------------------------
+
+
+class Chunk:
+    """
+    The columns of one chunk as NumPy views into the mapped file.
+    Deal i owns the player rows starts[i] to starts[i + 1].
+    """
+
+    def __init__(self, buffer: memoryview, deals: int, players: int):
+        offset = 0
+
+        def column(dtype, count: int, width: int = 1) -> np.ndarray:
+            nonlocal offset
+            values = np.frombuffer(buffer, dtype=dtype, count=count * width, offset=offset)
+            offset += values.nbytes
+            return values.reshape(count, width) if width > 1 else values
+
+        self.strengths = column(np.uint32, players)
+        self.boards = column(np.uint8, deals, 5)
+        self.seats = column(np.uint8, deals)
+        self.holes = column(np.uint8, players, 2)
+        self.results = column(np.uint8, players)
+        self.winners = column(np.uint8, players).view(bool)
+
+        self.starts = np.zeros(deals + 1, dtype=np.int64)
+        np.cumsum(self.seats, out=self.starts[1:])
+
+
+    def __len__(self) -> int:
+        return len(self.seats)
+
+
+class DealReader:
+    """
+    Maps a dataset file read only. Only the chunk headers are read up front,
+    the columns are paged in when a chunk gets used.
+    """
+
+    def __init__(self, path: str):
+        # mmap cannot map an empty file, which is just a dataset without deals.
+        with open(path, "rb") as f:
+            empty = os.fstat(f.fileno()).st_size == 0
+            self.mapping = b"" if empty else mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+        # (offset of the columns, deals, player rows) of every chunk.
+        self.index: list[tuple[int, int, int]] = []
+        offset = 0
+        while offset < len(self.mapping):
+            if offset + HEADER.size > len(self.mapping):
+                raise ValueError(f"{path} ends in the middle of a chunk header.")
+            magic, version, deals, players = HEADER.unpack_from(self.mapping, offset)
+            if magic != MAGIC or version != VERSION:
+                raise ValueError(f"{path} is no dataset of version {VERSION}.")
+
+            # strengths, boards and seats, holes, results and winners.
+            size = HEADER.size + players * 4 + deals * 6 + players * 4
+            # the writer only appends, a crash can leave the last chunk cut off.
+            if offset + size > len(self.mapping):
+                raise ValueError(f"{path} ends in the middle of a chunk, after {len(self)} whole deals.")
+            self.index.append((offset + HEADER.size, deals, players))
+            offset += size + padding(size)
+
+
+    def __len__(self) -> int:
+        return sum(deals for _, deals, _ in self.index)
+
+
+    def close(self):
+        """
+        Unmaps the file, Chunks and deals read from it can't be used anymore.
+        """
+        if isinstance(self.mapping, mmap.mmap):
+            self.mapping.close()
+
+
+    def __enter__(self) -> "DealReader":
+        return self
+
+
+    def __exit__(self, *args):
+        self.close()
+
+
+    def chunks(self):
+        """
+        Yields every Chunk in file order.
+        """
+        view = memoryview(self.mapping)
+        for offset, deals, players in self.index:
+            yield Chunk(view[offset:], deals, players)
+
+
+    def __iter__(self):
+        """
+        Yields every deal as (board, holes, results, strengths, winners),
+        the board as 5 codes and the rest with one row per player.
+        """
+        for chunk in self.chunks():
+            for i in range(len(chunk)):
+                rows = slice(chunk.starts[i], chunk.starts[i + 1])
+                yield (chunk.boards[i], chunk.holes[rows], chunk.results[rows], chunk.strengths[rows], chunk.winners[rows])
+
+
+# ----------------------------------------------------------------------------
+
+
+def record(path: str, games: int, players: int | None = None, chunk_size: int = 65536, seed: int | None = None):
+    """
+    Plays games random game()s and appends them to the dataset at path.
+    Without players, every game picks 2 to MAX_PLAYERS players like
+    analyze().
+    The same seed records the same games.
+    """
+    rng = Stream(fresh_seed() if seed is None else seed)
+    deck = Deck(rng)
+    with DealWriter(path, chunk_size) as writer:
+        for _ in range(games):
+            (board, hands) = game(players if players else rng.randint(2, MAX_PLAYERS), deck)
+            writer.add(board, hands)
@@ -1,21 +1,76 @@
-from card import Cards
-from card_types import Values, Symbols
+from card import Cards, CARDS
 import random
 
 
 class Deck:
-    def __init__(self):
-        self.cards: list[Cards] = []
+    """
+    The 52 cards as codes in one list, that is allocated once and reused.
+    The first size entries are still in the deck, the rest got dealt or
+    removed. Dealing swaps a random live card to the end of the live part,
+    which is one step of Fisher-Yates, so only dealt cards get shuffled.
+    rng is anything with a random() method, like random.Random or a
+    streams.Stream. Without one the global random module is used.
+    """
 
-        for value in Values:
-            for symbol in Symbols:
-                self.cards.append(Cards(value, symbol))
+    def __init__(self, rng=None):
+        self.codes: list[int] = list(range(52))
+        # where every code currently sits in self.codes.
+        self.position: list[int] = list(range(52))
+        self.size = 52
+        self.random = (rng or random).random
 
-        assert len(self.cards) == 52
 
+    @property
+    def cards(self) -> list[Cards]:
+        """
+        The cards still in the deck.
+        """
+        return [CARDS[code] for code in self.codes[:self.size]]
 
-    def deal(self) -> Cards:
-        if len(self.cards) == 0:
+
+    def reset(self):
+        """
+        Puts all cards back. The order left over from the last game does not
+        matter, every deal picks uniformly among the live cards anyway.
+        """
+        self.size = 52
+
+
+    def swap_out(self, index: int) -> int:
+        """
+        Moves the code at index behind the live part and returns it.
+        """
+        self.size -= 1
+        last = self.size
+        codes = self.codes
+        code = codes[index]
+        other = codes[last]
+
+        codes[index] = other
+        codes[last] = code
+        self.position[other] = index
+        self.position[code] = last
+
+        return code
+
+
+    def deal_code(self) -> int:
+        if self.size == 0:
             raise ValueError("Can't deal no more cards, Deck is empty.")
-        return self.cards.pop(random.randint(0, len(self.cards) - 1))
-        
+        # random() * size has a bias below 2 ** -50, cheaper than randint.
+        return self.swap_out(int(self.random() * self.size))
+
+
+    def deal(self) -> Cards:
+        return CARDS[self.deal_code()]
+
+
+    def remove(self, card: Cards):
+        """
+        Takes a known card out of the deck, for example the cards of a
+        player we already know.
+        """
+        index = self.position[card.index]
+        if index >= self.size:
+            raise ValueError("Card is not in the Deck anymore.")
+        self.swap_out(index)
@@ -0,0 +1,308 @@
+from card import Cards, CARDS
+from hand import Hand
+from board import Board
+from results import Result
+from tables import CATEGORY_SHIFT, BUCKETS, TABLE_MASK, load_tables
+
+
+# ----------------------------------------------------------------------------
+
+# Every card adds its key to the hand key.
+# The lower 32 bits are the rank counts written in base 5 (one digit per rank,
+# a rank can appear at most 4 times), so the sum tells us exactly how many
+# cards of every rank we hold, no matter the order.
+# The upper bits hold one nibble per suit counting the suited cards. The
+# nibbles start at 3, so bit 3 of a nibble is set as soon as a suit has 5 cards.
+SUIT_SHIFT = 32
+SUIT_BASE = 0x3333 << SUIT_SHIFT
+FLUSH_BITS = 0x8888 << SUIT_SHIFT
+RANK_BITS = (1 << SUIT_SHIFT) - 1
+
+CARD_KEYS: list[int] = [
+    5 ** (code >> 2) + (1 << (SUIT_SHIFT + 4 * (code & 3)))
+    for code in range(52)
+]
+
+
+# ----------------------------------------------------------------------------
+
+
+def category(strength: int) -> Result:
+    """
+    Maps a strength back to its Result.
+    """
+    return Result(strength >> CATEGORY_SHIFT)
+
+
+def powers(strength: int) -> list[int]:
+    """
+    Unpacks the deciding card powers of a strength, most important first.
+    """
+    res = []
+    for shift in (16, 12, 8, 4, 0):
+        power = strength >> shift & 15
+        if power:
+            res.append(power)
+
+    return res
+
+
+FLUSH_TABLE, OFFSETS, RANK_TABLE = load_tables()
+
+
+# ----------------------------------------------------------------------------
+
+
+def strength(codes: list[int]) -> int:
+    """
+    Ranks 5 to 7 encoded cards. Returns the strength of the best five cards,
+    higher is better, equal means split pot.
+    """
+    key = SUIT_BASE
+    for code in codes:
+        key += CARD_KEYS[code]
+
+    flush = key & FLUSH_BITS
+    if flush:
+        # only one suit can hold five of seven cards.
+        suit = (flush.bit_length() - SUIT_SHIFT - 4) >> 2
+        mask = 0
+        for code in codes:
+            if code & 3 == suit:
+                mask |= 1 << (code >> 2)
+        return FLUSH_TABLE[mask]
+
+    key &= RANK_BITS
+    return RANK_TABLE[(key + OFFSETS[key % BUCKETS]) & TABLE_MASK]
+
+
+# ----------------------------------------------------------------------------
+
+
+GROUP_SIZES: dict[Result, list[int]] = {
+    Result.Quads: [4],
+    Result.FullHouse: [3, 2],
+    Result.Triple: [3],
+    Result.TwoPair: [2, 2],
+    Result.Pair: [2],
+}
+
+
+def best_cards(cards: list[Cards], value: int) -> tuple[list[Cards], list[Cards]]:
+    """
+    Picks the cards behind a strength out of the given cards.
+    Returns the deciding cards and the kickers, both descending.
+    """
+    result = category(value)
+    deciding = powers(value)
+    ordered = sorted(cards, key=lambda card: card.power, reverse=True)
+
+    if result in (Result.Flush, Result.StraightFlush, Result.RoyalFlush):
+        symbols = [card.symbol for card in cards]
+        suit = max(set(symbols), key=symbols.count)
+        ordered = [card for card in ordered if card.symbol == suit]
+
+    if result in (Result.Straight, Result.StraightFlush, Result.RoyalFlush):
+        high = deciding[0]
+        needed = [high - i for i in range(5)] if high > 5 else [5, 4, 3, 2, 14]
+        eval_cards = []
+        for power in needed:
+            eval_cards.append(next(card for card in ordered if card.power == power))
+        return (eval_cards, [])
+
+    if result in (Result.Flush, Result.HighCard):
+        return (ordered[:5], [])
+
+    # the groups come first in the packed powers, kickers last.
+    sizes = GROUP_SIZES[result]
+
+    eval_cards = []
+    for power, size in zip(deciding, sizes):
+        eval_cards += [card for card in ordered if card.power == power][:size]
+
+    rest_cards = []
+    for power in deciding[len(sizes):]:
+        rest_cards.append(next(card for card in ordered if card.power == power))
+
+    return (eval_cards, rest_cards)
+
+
+# ----------------------------------------------------------------------------
+
+
+def hole_cards(hand: Hand | tuple[Cards, Cards]) -> tuple[Cards, Cards]:
+    """
+    game() deals plain tuples, but Hand objects are fine as well.
+    """
+    if isinstance(hand, Hand):
+        return hand.cards
+    return hand
+
+
+class Evaluation:
+    """
+    What evaluate() found: the strength and its Result right away, the best
+    five cards only when somebody asks for them, then they are kept.
+    Unpacks and indexes like the old (Result, (eval_cards, rest_cards))
+    tuple, and compares by strength.
+    """
+
+    __slots__ = ("strength", "category", "codes", "best")
+
+    def __init__(self, value: int, codes: tuple[int, ...]):
+        self.strength = value
+        self.category = category(value)
+        # the codes the strength was computed from, a later Board.run
+        # must not change which cards come out.
+        self.codes = codes
+        self.best: tuple[list[Cards], list[Cards]] | None = None
+
+
+    def cards(self) -> tuple[list[Cards], list[Cards]]:
+        """
+        The deciding cards and the kickers, both descending.
+        """
+        if self.best is None:
+            self.best = best_cards([CARDS[code] for code in self.codes], self.strength)
+        return self.best
+
+
+    @property
+    def eval_cards(self) -> list[Cards]:
+        return self.cards()[0]
+
+
+    @property
+    def rest_cards(self) -> list[Cards]:
+        return self.cards()[1]
+
+
+    def __iter__(self):
+        yield self.category
+        yield self.cards()
+
+
+    def __getitem__(self, index: int):
+        # [0] is only the Result, no need to pick the cards for it.
+        if index == 0:
+            return self.category
+        return (self.category, self.cards())[index]
+
+
+    def __eq__(self, other) -> bool:
+        if not isinstance(other, Evaluation):
+            return NotImplemented
+        return self.strength == other.strength
+
+
+    def __lt__(self, other: "Evaluation") -> bool:
+        return self.strength < other.strength
+
+
+    def __le__(self, other: "Evaluation") -> bool:
+        return self.strength <= other.strength
+
+
+    def __gt__(self, other: "Evaluation") -> bool:
+        return self.strength > other.strength
+
+
+    def __ge__(self, other: "Evaluation") -> bool:
+        return self.strength >= other.strength
+
+
+    def __hash__(self) -> int:
+        return self.strength
+
+
+    def __repr__(self) -> str:
+        return f"Evaluation({self.category.name}, {self.strength:#x})"
+
+
+def evaluate(board: Board, hand: Hand) -> Evaluation:
+    """
+    Ranks the hand with the lookup tables, game.evaluate is this function.
+    Other than the original it leaves board.cards untouched, and the cards
+    are only picked out when the result is looked at.
+    """
+    (first, second) = hole_cards(hand)
+    codes = tuple([card.index for card in board.cards] + [first.index, second.index])
+    value = strength(codes)
+
+    return Evaluation(value, codes)
+
+
+def evaluate_strength(board: Board, hand: Hand) -> int:
+    """
+    Only the comparable strength of a hand on a board, use category() to get
+    the Result back.
+    """
+    return strength([card.index for card in board.cards + list(hole_cards(hand))])
+
+
+# ----------------------------------------------------------------------------
+
+
+class BoardEval:
+    """
+    The board part of the hand key, computed once per street.
+    It keeps the summed card keys (rank and suit counts) and the rank mask
+    of every suit, so a player only adds two hole cards on top.
+    New board cards from Board.run are picked up on the next call.
+    """
+
+    def __init__(self, board: Board):
+        self.board = board
+        self.key = SUIT_BASE
+        self.masks = [0, 0, 0, 0]
+        self.size = 0
+        self.sync()
+
+
+    def sync(self):
+        """
+        Adds the board cards dealt since the last call, cards are only ever
+        appended to a board.
+        """
+        cards = self.board.cards
+        while self.size < len(cards):
+            code = cards[self.size].index
+            self.key += CARD_KEYS[code]
+            self.masks[code & 3] |= 1 << (code >> 2)
+            self.size += 1
+
+
+    def strength_codes(self, first: int, second: int) -> int:
+        """
+        Strength of two hole card codes on the current board.
+        """
+        if self.size != len(self.board.cards):
+            self.sync()
+
+        key = self.key + CARD_KEYS[first] + CARD_KEYS[second]
+
+        flush = key & FLUSH_BITS
+        if flush:
+            suit = (flush.bit_length() - SUIT_SHIFT - 4) >> 2
+            mask = self.masks[suit]
+            if first & 3 == suit:
+                mask |= 1 << (first >> 2)
+            if second & 3 == suit:
+                mask |= 1 << (second >> 2)
+            return FLUSH_TABLE[mask]
+
+        key &= RANK_BITS
+        return RANK_TABLE[(key + OFFSETS[key % BUCKETS]) & TABLE_MASK]
+
+
+    def strength(self, hand: Hand) -> int:
+        (first, second) = hole_cards(hand)
+        return self.strength_codes(first.index, second.index)
+
+
+def street_strengths(board: Board, hands: list[Hand]) -> list[int]:
+    """
+    Strength of every hand on the board as it is now, flop, turn or river.
+    """
+    state = BoardEval(board)
+    return [state.strength(hand) for hand in hands]
@@ -0,0 +1,135 @@
+from card import Cards
+from board import Board
+from hand import Hand
+from evaluator import SUIT_BASE, hole_cards
+from batch import KEYS, rank_keys, combinations
+from canon import canonical_codes
+from functools import lru_cache
+import numpy as np
+
+
+# ----------------------------------------------------------------------------
+
+
+class Equity:
+    """
+    Exact chances of one player. win is winning alone, tie is splitting the
+    pot with others, equity is the share of all pots including the splits.
+    Immutable, the cached results are handed out to every caller.
+    """
+
+    __slots__ = ("win", "tie", "loss", "equity")
+
+    def __init__(self, win: float, tie: float, equity: float):
+        object.__setattr__(self, "win", win)
+        object.__setattr__(self, "tie", tie)
+        object.__setattr__(self, "loss", 1.0 - win - tie)
+        object.__setattr__(self, "equity", equity)
+
+
+    def __setattr__(self, name: str, value):
+        raise AttributeError("Equity is immutable.")
+
+
+    def __delattr__(self, name: str):
+        raise AttributeError("Equity is immutable.")
+
+
+    def __reduce__(self):
+        return (Equity, (self.win, self.tie, self.equity))
+
+
+    def __repr__(self) -> str:
+        return f"Equity(win={self.win:.4f}, tie={self.tie:.4f}, loss={self.loss:.4f}, equity={self.equity:.4f})"
+
+
+# ----------------------------------------------------------------------------
+
+
+def runouts(known: list[int], cards: int) -> tuple[np.ndarray, np.ndarray]:
+    """
+    All ways to draw cards more cards, with the known codes removed.
+    Runouts that only differ by swapping suits nobody holds are the same
+    situation, so only one of them is kept together with a weight, how often
+    it stands for the others.
+    Returns the (R, cards) codes and the (R,) weights.
+    """
+    deck = np.array([code for code in range(52) if code not in known], dtype=np.int16)
+    codes = deck[combinations(len(deck), cards)]
+
+    free = [suit for suit in range(4) if all(code & 3 != suit for code in known)]
+    if len(free) < 2 or cards == 0:
+        return (codes, np.ones(len(codes), dtype=np.int64))
+
+    # rank mask of every free suit, a runout is kept when the masks go down.
+    masks = [
+        np.bitwise_or.reduce(np.where((codes & 3) == suit, 1 << (codes >> 2), 0), axis=1)
+        for suit in free
+    ]
+    keep = np.ones(len(codes), dtype=bool)
+    for higher, lower in zip(masks, masks[1:]):
+        keep &= higher >= lower
+
+    # the number of distinct reorderings of the sorted masks.
+    weights = np.ones(len(codes), dtype=np.int64)
+    run = np.ones(len(codes), dtype=np.int64)
+    for i in range(1, len(free)):
+        run = np.where(masks[i] == masks[i - 1], run + 1, 1)
+        weights = weights * (i + 1) // run
+
+    return (codes[keep], weights[keep])
+
+
+def exact_equity(hands: list[Hand], board: Board | None = None, dead: list[Cards] = []) -> list[Equity]:
+    """
+    Exact win, tie and loss chances of the hands by going through every
+    remaining runout of the board. Without a board it starts preflop.
+    The dead cards are known to be out of the deck.
+    Situations that only differ by the suits are computed once.
+    """
+    hole = [[card.index for card in hole_cards(hand)] for hand in hands]
+    shown = [card.index for card in board.cards] if board else []
+    known = shown + [code for cards in hole for code in cards] + [card.index for card in dead]
+    if len(set(known)) != len(known):
+        raise ValueError("The same card is used twice.")
+    if len(shown) not in (0, 3, 4, 5):
+        raise ValueError("A board has 3 to 5 cards.")
+    if len(known) + 5 - len(shown) > 52:
+        raise ValueError("Not enough cards left to run out the board.")
+
+    (shown, hole, dead_codes, _) = canonical_codes(shown, hole, [card.index for card in dead])
+    return list(equity_codes(shown, hole, dead_codes))
+
+
+@lru_cache(maxsize=4096)
+def equity_codes(shown: tuple[int, ...], hole: tuple[tuple[int, ...], ...], dead: tuple[int, ...]) -> tuple[Equity, ...]:
+    """
+    exact_equity on codes, cached by the canonical situation.
+    """
+    known = list(shown) + [code for cards in hole for code in cards] + list(dead)
+    (codes, weights) = runouts(known, 5 - len(shown))
+
+    # the board key is shared, every player only adds the two hole cards.
+    boards = np.concatenate((codes, np.broadcast_to(np.array(shown, dtype=np.int16), (len(codes), len(shown)))), axis=1)
+    board_keys = KEYS[boards].sum(axis=1, dtype=np.uint64) + np.uint64(SUIT_BASE)
+    strengths = []
+    for cards in hole:
+        keys = board_keys + np.uint64(int(KEYS[list(cards)].sum()))
+        strengths.append(rank_keys(keys, boards, list(cards)))
+
+    strengths = np.stack(strengths)
+    best = strengths.max(axis=0)
+    on_top = strengths == best
+    winners = on_top.sum(axis=0)
+
+    total = weights.sum()
+    result = []
+    for player in range(len(hole)):
+        alone = on_top[player] & (winners == 1)
+        split = on_top[player] & (winners > 1)
+        win = weights[alone].sum() / total
+        tie = weights[split].sum() / total
+        share = (weights[split] / winners[split]).sum() / total
+        result.append(Equity(win, tie, win + share))
+
+    return tuple(result)
@@ -1,25 +1,10 @@
-from card import Cards
-from card_types import Values, Symbols
+from card import Cards, CARDS
+from card_types import Values
 from hand import Hand
 from board import Board
 from deck import Deck
-from enum import Enum
-
-
-# ----------------------------------------------------------------------------
-
-
-class Result(Enum):
-    HighCard = 0
-    Pair = 1
-    TwoPair = 2
-    Triple = 3
-    Straight = 4
-    Flush = 5
-    FullHouse = 6
-    Quads = 7
-    StraightFlush = 8
-    RoyalFlush = 9
+from results import Result, straight_high
+from evaluator import evaluate
 
 
 # ----------------------------------------------------------------------------
@@ -46,91 +31,54 @@ def summs(cards: list[Cards]) -> dict[Values, int]:
 
 def sort_cards(cards: list[Cards]) -> list[Cards]:
     """
-    Sorts the cards with the overwritten leq comparison and internal power
-    member. Returns ascendingly sorted list.
+    Sorts the cards with the overwritten lt comparison and internal power
+    member. Returns ascendingly sorted list, the input stays untouched.
     Used for computing straights.
     """
-    result = []
-    
-    while len(cards) > 0:
+    return sorted(cards)
 
-        smallest = Cards(Values.Dummy, Symbols.Spade)
-        # Dummy has the highest value, so will be overwritten by every card.
-        delete = -1 # index for removal of current smallest element.
 
-        for index, card in enumerate(cards):
-            if card <= smallest: # overwritten leq operator.
+# ----------------------------------------------------------------------------
 
-                # remember current smallest in list and its index.
-                smallest = card
-                delete = index
-        
-        # remove current smallest for future iterations and add to result.
-        result.append(smallest)
-        cards.remove(delete)
 
-        # should not happen, but guarded, to prevent future problems.
-        assert delete != -1
-    
-    return result
+# The highest straight of every 13 bit rank mask (bit 0 is the Two), so
+# finding one is a single lookup.
+STRAIGHTS: list[int] = [straight_high(mask) for mask in range(1 << 13)]
 
 
-# ----------------------------------------------------------------------------
+def rank_masks(cards: list[Cards]) -> tuple[int, list[int]]:
+    """
+    The ranks in the cards as a 13 bit mask, once for all cards and once per
+    suit (in the order of Symbols).
+    """
+    suits = [0, 0, 0, 0]
+    for card in cards:
+        suits[card.index & 3] |= 1 << (card.index >> 2)
+
+    return (suits[0] | suits[1] | suits[2] | suits[3], suits)
+
+
+def straight_cards(high: int, cards: list[Cards]) -> list[Cards]:
+    """
+    One card of every rank of the straight up to power high, ascending, the
+    wheel starts with its Ace.
+    """
+    by_rank = {card.index >> 2: card for card in cards}
+    ranks = [12, 0, 1, 2, 3] if high == 5 else range(high - 6, high - 1)
+    return [by_rank[rank] for rank in ranks]
 
 
 def check_straight(cards: list[Cards]) -> list[Cards]:
     """
     Check for any straight in the cards, meaning at least 5 in a row.
-    Returns all the cards particapaiting in the straight.
+    Returns the five cards of the highest straight, ascending.
     If the list is empty, means there is no straight.
     """
-    # Sort the cards ascendingly.
-    cards = sort_cards(cards)
-    
-    prev_max = 1 # maximum reached straight.
-    straight = 1 # counts the back to back cards.
-    prev_power = cards[0].power # first cards power. 
-    end_index = 0 # ending index of the straight.
-    
-    for i, card in enumerate(cards[1:]):
-        
-        # the current cards power is exactly one more the the previous.
-        # this means those are back to back cards.
-        if card.power - 1 == prev_power:
-            straight += 1
-        
-        # Special case, when we habe a pair in the middle, does not 
-        # increase the straight, but doesnt break it as well.
-        elif card.power == prev_power:
-            pass
+    (mask, _) = rank_masks(cards)
+    high = STRAIGHTS[mask]
+
+    return straight_cards(high, cards) if high else []
 
-        # The distance between the two cards is at least two.
-        else:
-            # we change prev_max if we reached a higher straight or equal.
-            # because of ascending sort that means, that a new equal straight is a
-            # higher straight.
-            # we remember how long out straight was and where it ended.
-            # we end with plus one, because we dont iterate from 0.
-            prev_max = straight
-            end_index = i + 1 if straight >= prev_max else end_index
-            straight = 1
-        
-        # always get the new power.
-        prev_power = card.power
-    
-    # Special case, if the straight is Ace, 2, 3, 4, 5.
-    if straight == 4 and cards[end_index].power == 5:
-        if cards[-1].value == Symbols.Ace:
-            return [cards[-1]] + [cards[:end_index]]
-    
-    # normal case, return all, even though we only count 5.
-    # Higher one wins, but lower one could be a flush, so give all.
-    elif straight >= 5:
-        return cards[end_index - straight : end_index]
-    
-    # no straight, so empty list.
-    else:
-        return []
 
 # ----------------------------------------------------------------------------
 
@@ -172,37 +120,38 @@ def transform(reference: list[Values], target: list[Cards], sort: bool = True) -
 # ----------------------------------------------------------------------------
 
 
+def flush_suit(suits: list[int]) -> int:
+    """
+    The suit with at least 5 cards in the suit masks of rank_masks, -1 if
+    there is none. 7 cards can only make one flush.
+    """
+    for suit, mask in enumerate(suits):
+        if mask.bit_count() >= 5:
+            return suit
+
+    return -1
+
+
 def check_flush(cards: list[Cards]) -> list[Cards]:
     """
     Checks if the cards hold a flush.
-    Simple, just checking for symbols.
+    Returns the five highest cards of the flush suit ascending, empty if
+    there is none.
     """
-    
-    # save the different symbols
-    heart = []
-    spade = []
-    diamond = []
-    club = []
+    (_, suits) = rank_masks(cards)
+    suit = flush_suit(suits)
+    if suit < 0:
+        return []
 
-    for card in cards:
-        if card.symbol == Symbols.Heart:
-            heart.append(card)
-        elif card.symbol == Symbols.Spade:
-            spade.append(card)
-        elif card.symbol == Symbols.Diamond:
-            diamond.append(card)
-        else:
-            club.append(card)
-    
-    result = [heart, spade, diamond, club]
-    
-    # check for flush.
-    for l in result:
-        if len(l) >= 5:
-            return l
+    # walk the ranks of the suit down from the Ace.
+    mask = suits[suit]
+    ranks = []
+    while len(ranks) < 5:
+        rank = mask.bit_length() - 1
+        ranks.append(rank)
+        mask ^= 1 << rank
 
-    # No Flush.
-    return []
+    return [CARDS[rank << 2 | suit] for rank in reversed(ranks)]
 
 
 # ----------------------------------------------------------------------------
@@ -240,13 +189,17 @@ def compare_pairs(c1: list[Cards], c2: list[Cards]) -> tuple[bool, tuple[list[Ca
 # ----------------------------------------------------------------------------
 
     
-def evaluate(board: Board, hand: Hand) -> tuple[Result, tuple[list[Cards], list[Cards]]]:
+def legacy_evaluate(board: Board, hand: Hand) -> tuple[Result, tuple[list[Cards], list[Cards]]]:
+    """
+    The original evaluator, counting and sorting the cards by hand. Kept to
+    compare against and for the benchmarks, evaluate() (the table evaluator
+    of evaluator.py) is the one to use.
+    """
     
     # TODO: Probably best to do: (Result.value, ([eval_cards], [rest_cards]))
         
-    c = board.cards
-    c.append(hand[0])
-    c.append(hand[1])
+    # copy, the board itself should not get the hole cards appended.
+    c = board.cards + [hand[0], hand[1]]
 
     hits = summs(c)
 
@@ -263,7 +216,7 @@ def evaluate(board: Board, hand: Hand) -> tuple[Result, tuple[list[Cards], list[
 
     if hit[0] == 4 and result.value <= Result.Quads.value:
 
-        result = Result.Quad # assign the result.
+        result = Result.Quads # assign the result.
         eval_cards = transform(get_keys(4,hits),c) # get all the cards with the Value
         # which has the quads.
         
@@ -318,15 +271,15 @@ def evaluate(board: Board, hand: Hand) -> tuple[Result, tuple[list[Cards], list[
             tmp = sort_cards(tmp)
             
             # We only need the higher pair, so we take the two Bs.
-            eval_cards = transform(get_keys(3),c)
-            eval_cards.append(tmp[2:])
+            eval_cards = transform(get_keys(3,hits),c)
+            eval_cards.extend(tmp[2:])
 
         # Normal Full House, we only have 3,2,1,1:
         else:
 
             # just add the 3 and two.
             eval_cards = transform(get_keys(3,hits),c)
-            eval_cards.append(transform(get_keys(2,hits),c))
+            eval_cards.extend(transform(get_keys(2,hits),c))
         
         
         # all Full Houses have five cards, so no rest.
@@ -363,7 +316,7 @@ def evaluate(board: Board, hand: Hand) -> tuple[Result, tuple[list[Cards], list[
             tmp = transform(get_keys(1,hits),c)
             
             # we now add the AA to tmp
-            tmp.append(eval_cards[:2])
+            tmp.extend(eval_cards[:2])
             
             tmp = sort_cards(tmp)
             
@@ -415,105 +368,71 @@ def evaluate(board: Board, hand: Hand) -> tuple[Result, tuple[list[Cards], list[
 
 # ++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
     
-    # remember what we achieved in case of royal/ straight flush
-    flush = False
-    straight = False
-    
-    # get the straight and flush cards if it exists:
-    st = []
-    fl = []
-
-    # if list is not empty we got a straight.
-    if check_straight(c):
-        st = check_straight(c)
-        straight = True
-
-        # we check anyway, for straight/royal flush, but only assign if
-        # we did not get better stuff before.
-        if result.value <= Result.Straight.value:
-            eval_cards = st
-            rest_cards = []
-            result = Result.Straight
-            
-            # only take the highest part of the straight.
-            if len(eval_cards) == 6:
-                eval_cards = eval_cards[1:]
-
-            elif len(eval_cards) == 7:
-                eval_cards = eval_cards[2:]
-
-# ++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+    # straights and flushes straight from the rank masks, no sorting.
+    (mask, suits) = rank_masks(c)
+    suit = flush_suit(suits)
+
+    # a straight flush beats everything, the Ace high one is royal.
+    if suit >= 0 and STRAIGHTS[suits[suit]]:
+        high = STRAIGHTS[suits[suit]]
+        result = Result.RoyalFlush if high == 14 else Result.StraightFlush
+        eval_cards = straight_cards(high, [card for card in c if card.index & 3 == suit])
+        rest_cards = []
 
-    # same for flush
-    if check_flush(c):
-        fl = check_flush(c)
-        flush = True
+    # we update our result in case of no better option:
+    elif suit >= 0 and result.value <= Result.Flush.value:
+        result = Result.Flush
+        eval_cards = check_flush(c)
+        rest_cards = []
 
-        # we update our result in case of no better option:
-        if result.value <= Result.Flush.value:
-            eval_cards = fl
-            rest_cards = []
-            result = Result.Flush
+    elif STRAIGHTS[mask] and result.value <= Result.Straight.value:
+        result = Result.Straight
+        eval_cards = straight_cards(STRAIGHTS[mask], c)
+        rest_cards = []
 
-            # get the highest flush
-            eval_cards = sort_cards(eval_cards)
+    return (result, (eval_cards, rest_cards))
     
-            if len(eval_cards) == 6:
-                eval_cards = eval_cards[1:]
 
-            if len(eval_cards) == 7:
-                eval_cards = eval_cards[2:]
-
-# ++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
-    
-    # set straight_flush for royal flush.
-    straight_flush = False
 
-    
-    # check for straight flush.
-    if straight and flush:
-        symb = fl[0].symbol
-        back_to_back = 0
-        max_combo = 0
-        for card in st:
-            if card.symbol == symb:
-                back_to_back += 1
-            else:
-                if back_to_back >= max_combo:
-                    # take care of special cases!!!!!
-                    max_combo = back_to_back
-
-        if max_combo >= 5 or back_to_back >= 5:
-            # straight flush
-            straight_flush = True
-            result = Result.StraightFlush
-    
+# ----------------------------------------------------------------------------
 
-    if straight_flush and st[-1].value == Values.Ace:
-        result = Result.RoyalFlush
-    
-    return (result, (eval_cards, rest_cards))
-    
+# game() burns a card before the hands, the flop, the turn and the river,
+# 21 players use 51 cards and 22 would need 53.
+MAX_PLAYERS = 21
 
 
-# ----------------------------------------------------------------------------
+def check_players(players: int):
+    """
+    Raises a ValueError unless game() can deal for players players.
+    """
+    if not 2 <= players <= MAX_PLAYERS:
+        raise ValueError(f"game() deals for 2 to {MAX_PLAYERS} players, not {players}.")
 
 
-def game(players: int):
+def game(players: int, deck: Deck | None = None, rng=None, known: list[tuple[Cards, Cards]] = []):
     
-    # You can play with 2 to 22 players, else it doesnt work.
-    assert 2 <= players <= 22
+    check_players(players)
+    assert len(known) <= players
+
+    # initialize the deck, or reuse the one we got for many games.
+    # rng is only for a new deck, a given deck keeps its own.
+    if deck is None:
+        deck = Deck(rng)
+    else:
+        deck.reset()
 
-    # initialize the deck
-    deck = Deck()
+    # the first seats can have known hole cards, they never get dealt.
+    for cards in known:
+        for card in cards:
+            deck.remove(card)
 
     # draw one card:
     deck.deal()
 
     # deal the hands:
-    hands: list[Hand] = []
+    hands: list[Hand] = list(known)
     
-    for _ in range(players):
+    for _ in range(players - len(known)):
         h = (deck.deal(), deck.deal())
         hands.append(h)
 
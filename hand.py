@@ -4,5 +4,21 @@ class Hand:
     def __init__(self, cards: tuple[Cards, Cards]):
         self.cards = cards
 
-        
 
+# ----------------------------------------------------------------------------
+
+
+RANK_CHARS = "23456789TJQKA"
+
+
+def starting_hand(cards: tuple[Cards, Cards]) -> str:
+    """
+    Short name of the two hole cards, like "AKs", "T9o" or "QQ".
+    Higher card first, s for suited, o for offsuit.
+    """
+    high, low = sorted(cards, key=lambda card: card.power, reverse=True)
+    name = RANK_CHARS[high.power - 2] + RANK_CHARS[low.power - 2]
+
+    if high.power == low.power:
+        return name
+    return name + ("s" if high.symbol == low.symbol else "o")
@@ -0,0 +1,196 @@
+from results import Result
+from evaluator import category
+from contextlib import contextmanager
+from importlib import import_module
+from time import perf_counter
+import json
+import sys
+
+
+# ----------------------------------------------------------------------------
+
+# The stages that get timed: name -> (module, function or Class.method).
+# Nothing is wrapped until enable(), so when it is off the code runs exactly
+# as without this module.
+STAGES: dict[str, tuple[str, str]] = {
+    "deal": ("deck", "Deck.deal_code"),
+    "game": ("game", "game"),
+    "sort_cards": ("game", "sort_cards"),
+    "check_straight": ("game", "check_straight"),
+    "check_flush": ("game", "check_flush"),
+    "legacy_evaluate": ("game", "legacy_evaluate"),
+    "evaluate": ("evaluator", "evaluate"),
+    "strength": ("evaluator", "strength"),
+    "board_strength": ("evaluator", "BoardEval.strength_codes"),
+    "hand_strengths": ("showdown", "hand_strengths"),
+    "showdown": ("showdown", "showdown"),
+    "winners": ("showdown", "winners"),
+    "rank": ("showdown", "Showdown.rank"),
+}
+
+
+class Profile:
+    """
+    Calls and total seconds per stage, and how often every Result came up
+    (from evaluate and from the strengths of every showdown).
+    Times include the stages called inside, so they don't add up.
+    """
+
+    def __init__(self):
+        self.calls: dict[str, int] = {}
+        self.seconds: dict[str, float] = {}
+        self.results: dict[Result, int] = {}
+
+
+    def clear(self):
+        self.calls.clear()
+        self.seconds.clear()
+        self.results.clear()
+
+
+    def report(self) -> dict:
+        """
+        The numbers as plain dicts, ready for json.
+        """
+        stages = {}
+        for name in sorted(self.calls, key=self.seconds.__getitem__, reverse=True):
+            calls = self.calls[name]
+            stages[name] = {
+                "calls": calls,
+                "seconds": self.seconds[name],
+                "us_per_call": self.seconds[name] / calls * 1e6,
+            }
+        results = {result.name: self.results.get(result, 0) for result in Result}
+        return {"stages": stages, "results": results}
+
+
+    def dump(self, path: str):
+        with open(path, "w") as f:
+            json.dump(self.report(), f, indent=2)
+
+
+    def __str__(self) -> str:
+        report = self.report()
+        lines = [f"{'stage':<16}{'calls':>12}{'seconds':>12}{'us/call':>10}"]
+        for name, stage in report["stages"].items():
+            lines.append(f"{name:<16}{stage['calls']:>12}{stage['seconds']:>12.3f}{stage['us_per_call']:>10.2f}")
+        lines.append("")
+        for name, count in report["results"].items():
+            lines.append(f"{name:<16}{count:>12}")
+        return "\n".join(lines)
+
+
+PROFILE = Profile()
+
+# original function of every wrapped stage, to put them back.
+ORIGINALS: dict[str, object] = {}
+
+
+# ----------------------------------------------------------------------------
+
+
+def count_results(name: str, value):
+    """
+    Adds the Results of a stage's return value to the histogram.
+    """
+    results = PROFILE.results
+    if name in ("evaluate", "legacy_evaluate"):
+        results[value[0]] = results.get(value[0], 0) + 1
+    elif name == "hand_strengths":
+        for strength in value:
+            result = category(strength)
+            results[result] = results.get(result, 0) + 1
+
+
+def wrap(name: str, function):
+    calls = PROFILE.calls
+    seconds = PROFILE.seconds
+    histogram = name in ("evaluate", "legacy_evaluate", "hand_strengths")
+
+    def timed(*args, **kwargs):
+        start = perf_counter()
+        try:
+            value = function(*args, **kwargs)
+        finally:
+            seconds[name] = seconds.get(name, 0.0) + perf_counter() - start
+            calls[name] = calls.get(name, 0) + 1
+        if histogram:
+            count_results(name, value)
+        return value
+
+    timed.__wrapped__ = function
+    timed.__name__ = function.__name__
+    timed.__doc__ = function.__doc__
+    return timed
+
+
+def replace(module_name: str, attribute: str, old, new):
+    """
+    Puts new in place of old, in the module or class and in every module
+    that imported it by name.
+    """
+    module = import_module(module_name)
+    if "." in attribute:
+        (cls, method) = attribute.split(".")
+        setattr(getattr(module, cls), method, new)
+        return
+
+    for other in list(sys.modules.values()):
+        if getattr(other, attribute, None) is old:
+            setattr(other, attribute, new)
+
+
+def enable():
+    """
+    Starts timing every stage of STAGES in this process. Worker processes
+    of simulate() are not seen, profile with workers=1.
+    """
+    for name, (module_name, attribute) in STAGES.items():
+        if name in ORIGINALS:
+            continue
+        owner = import_module(module_name)
+        for part in attribute.split("."):
+            owner = getattr(owner, part)
+        ORIGINALS[name] = owner
+        replace(module_name, attribute, owner, wrap(name, owner))
+
+
+def disable():
+    """
+    Puts the original functions back, the collected numbers stay.
+    """
+    for name, original in list(ORIGINALS.items()):
+        (module_name, attribute) = STAGES[name]
+        module = import_module(module_name)
+        wrapped = getattr(module, attribute.split(".")[0])
+        if "." in attribute:
+            wrapped = getattr(wrapped, attribute.split(".")[1])
+        replace(module_name, attribute, wrapped, original)
+        del ORIGINALS[name]
+
+
+@contextmanager
+def profiling(path: str | None = None):
+    """
+    with profiling("profile.json"): simulate(...)
+    Clears PROFILE, times everything inside and writes the report to path.
+    """
+    PROFILE.clear()
+    enable()
+    try:
+        yield PROFILE
+    finally:
+        disable()
+        if path:
+            PROFILE.dump(path)
+
+
+# ----------------------------------------------------------------------------
+
+
+if __name__ == "__main__":
+    from simulate import simulate
+
+    with profiling() as profile:
+        simulate(10000, players=6, workers=1, seed=0)
+    print(profile)
@@ -0,0 +1,203 @@
+from game import MAX_PLAYERS
+from simulate import Stats, BATCH, run_shard
+from streams import fresh_seed
+from concurrent.futures import ProcessPoolExecutor
+import json
+import os
+import sys
+import time
+
+
+# ----------------------------------------------------------------------------
+
+# Long simulations as jobs that survive being killed. A job plays games
+# games for every table size, in batches of BATCH. Every batch has its own
+# random stream (seed, players << 32 | batch), so the random state to save
+# is only which batches are done. The checkpoint file holds those and the
+# Stats so far, and gets replaced atomically, a kill loses at most the
+# batches since the last one.
+
+JOB_VERSION = 1
+
+# every table size game() can deal.
+PLAYERS = list(range(2, MAX_PLAYERS + 1))
+
+
+def stream_index(players: int, batch: int) -> int:
+    return players << 32 | batch
+
+
+def write_json(path: str, data: dict):
+    """
+    Writes to a temporary file first, so path always holds a whole file.
+    """
+    tmp = f"{path}.{os.getpid()}.tmp"
+    with open(tmp, "w") as f:
+        json.dump(data, f)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp, path)
+
+
+def read_json(path: str) -> dict:
+    with open(path) as f:
+        data = json.load(f)
+    if data.get("version") != JOB_VERSION:
+        raise ValueError(f"{path} is not a job file of version {JOB_VERSION}.")
+    return data
+
+
+class Job:
+    """
+    games games for every number of players, checkpointed to path.
+    If path exists the job continues from it, it has to be the same job.
+    shard and shards split the batches between machines: every machine runs
+    the same job with its own shard number and merge() adds them up.
+    """
+
+    def __init__(
+        self, path: str, games: int, players: list[int] = PLAYERS, seed: int | None = None,
+        shard: int = 0, shards: int = 1,
+    ):
+        self.path = path
+        self.games = games
+        self.players = list(players)
+        self.shard = shard
+        self.shards = shards
+        self.stats: dict[int, Stats] = {count: Stats() for count in self.players}
+        self.done: dict[int, set[int]] = {count: set() for count in self.players}
+
+        if os.path.exists(path):
+            self.resume(read_json(path), seed)
+        else:
+            self.seed = fresh_seed() if seed is None else seed
+
+
+    def resume(self, data: dict, seed: int | None):
+        if data["games"] != self.games or data["players"] != self.players or (data["shard"], data["shards"]) != (self.shard, self.shards):
+            raise ValueError(f"{self.path} belongs to another job.")
+        if seed is not None and data["seed"] != seed:
+            raise ValueError(f"{self.path} was started with another seed.")
+
+        self.seed = data["seed"]
+        for count in self.players:
+            self.stats[count] = Stats.load(data["stats"][str(count)])
+            self.done[count] = set(data["done"][str(self.seed)][str(count)])
+
+
+    def batches(self, players: int) -> list[int]:
+        """
+        The batches of this shard still to run.
+        """
+        total = (self.games + BATCH - 1) // BATCH
+        return [batch for batch in range(self.shard, total, self.shards) if batch not in self.done[players]]
+
+
+    def size(self, batch: int) -> int:
+        return min(BATCH, self.games - batch * BATCH)
+
+
+    def checkpoint(self):
+        write_json(self.path, {
+            "version": JOB_VERSION,
+            "games": self.games,
+            "players": self.players,
+            "seed": self.seed,
+            "shard": self.shard,
+            "shards": self.shards,
+            "done": {str(self.seed): {str(count): sorted(self.done[count]) for count in self.players}},
+            "stats": {str(count): self.stats[count].dump() for count in self.players},
+        })
+
+
+    def finished(self) -> bool:
+        return not any(self.batches(count) for count in self.players)
+
+
+    def run(self, workers: int | None = None, every: float = 60.0):
+        """
+        Runs the missing batches, saving a checkpoint at least every every
+        seconds and at the end.
+        """
+        workers = workers or os.cpu_count() or 1
+        last = time.monotonic()
+        pool = ProcessPoolExecutor(max_workers=workers) if workers > 1 else None
+
+        try:
+            for count in self.players:
+                todo = self.batches(count)
+                args = (
+                    [self.size(batch) for batch in todo], [count] * len(todo),
+                    [self.seed] * len(todo), [stream_index(count, batch) for batch in todo],
+                )
+                results = pool.map(run_shard, *args) if pool else map(run_shard, *args)
+
+                for batch, stats in zip(todo, results):
+                    self.stats[count].merge(stats)
+                    self.done[count].add(batch)
+                    if time.monotonic() - last >= every:
+                        self.checkpoint()
+                        last = time.monotonic()
+        finally:
+            if pool:
+                pool.shutdown(cancel_futures=True)
+            self.checkpoint()
+
+
+# ----------------------------------------------------------------------------
+
+
+def merge(paths: list[str], out: str) -> dict[int, Stats]:
+    """
+    Adds up the Stats of several job files (checkpoints, finished jobs or
+    earlier merges) into out. Runs with different seeds are independent;
+    with the same seed the batches must not overlap, like different shards,
+    or the same games would be counted twice.
+    """
+    stats: dict[int, Stats] = {}
+    done: dict[str, dict[str, set[int]]] = {}
+
+    for path in paths:
+        data = read_json(path)
+        for seed, counts in data["done"].items():
+            mine = done.setdefault(seed, {})
+            for count, batches in counts.items():
+                seen = mine.setdefault(count, set())
+                if seen & set(batches):
+                    raise ValueError(f"{path} repeats batches of seed {seed} with {count} players.")
+                seen |= set(batches)
+        for count, data_stats in data["stats"].items():
+            stats.setdefault(int(count), Stats()).merge(Stats.load(data_stats))
+
+    write_json(out, {
+        "version": JOB_VERSION,
+        "games": None,
+        "players": sorted(stats),
+        "seed": None,
+        "shard": None,
+        "shards": None,
+        "done": {seed: {count: sorted(batches) for count, batches in counts.items()} for seed, counts in done.items()},
+        "stats": {str(count): stats[count].dump() for count in sorted(stats)},
+    })
+
+    return stats
+
+
+def load(path: str) -> dict[int, Stats]:
+    """
+    The Stats of every table size in a job file.
+    """
+    return {int(count): Stats.load(data) for count, data in read_json(path)["stats"].items()}
+
+
+# ----------------------------------------------------------------------------
+
+
+if __name__ == "__main__":
+    # python jobs.py checkpoint.json games [shard shards]
+    # python jobs.py merge out.json a.json b.json ...
+    if sys.argv[1] == "merge":
+        merge(sys.argv[3:], sys.argv[2])
+    else:
+        (shard, shards) = (int(sys.argv[3]), int(sys.argv[4])) if len(sys.argv) > 4 else (0, 1)
+        Job(sys.argv[1], int(sys.argv[2]), shard=shard, shards=shards).run()
@@ -0,0 +1,74 @@
+from card import Cards
+from board import Board
+from hand import Hand
+from evaluator import SUIT_BASE, hole_cards
+from batch import KEYS, rank_keys, shuffle_prefix
+from exact import Equity
+from streams import generator, fresh_seed
+import numpy as np
+
+
+# ----------------------------------------------------------------------------
+
+# Trials are run this many at a time.
+BLOCK = 1 << 15
+
+# Without burn cards one more player fits than in game(), 44 hole cards and
+# 5 board cards.
+MAX_PLAYERS = 22
+
+
+def multiway_equity(
+    hands: list[Hand], opponents: int, board: Board | None = None, dead: list[Cards] = [],
+    trials: int = 100000, seed: int | None = None,
+) -> list[Equity]:
+    """
+    All in equity of the known hands against opponents random hands, with
+    the board (None preflop) run out to the river trials times.
+    Every trial sums the board key once, each player then only adds the
+    key of the hole cards and looks it up, so a seat costs about the same
+    at 2 and at 22 players. Split pots are shared among the tied seats.
+    Returns one Equity per seat, the known hands first, then the opponents.
+    """
+    known = [[card.index for card in hole_cards(hand)] for hand in hands]
+    shown = [card.index for card in board.cards] if board else []
+    out = shown + [code for cards in known for code in cards] + [card.index for card in dead]
+    assert len(set(out)) == len(out), "the same card is used twice"
+
+    players = len(known) + opponents
+    missing = 5 - len(shown)
+    assert 2 <= players <= MAX_PLAYERS
+    assert len(out) + 2 * opponents + missing <= 52
+
+    rng = generator(fresh_seed() if seed is None else seed, 0)
+    deck = np.array([code for code in range(52) if code not in out], dtype=np.int16)
+    known_keys = [np.uint64(int(KEYS[cards].sum())) for cards in known]
+
+    wins = np.zeros(players)
+    ties = np.zeros(players)
+    shares = np.zeros(players)
+
+    for start in range(0, trials, BLOCK):
+        rows = min(BLOCK, trials - start)
+        drawn = shuffle_prefix(deck, rows, 2 * opponents + missing, rng)
+
+        # the board of every trial, summed once for everybody.
+        boards = np.concatenate((np.broadcast_to(np.array(shown, dtype=np.int16), (rows, len(shown))), drawn[:, 2 * opponents:]), axis=1)
+        board_keys = KEYS[boards].sum(axis=1, dtype=np.uint64) + np.uint64(SUIT_BASE)
+
+        strengths = np.empty((players, rows), dtype=np.uint32)
+        for seat, (cards, key) in enumerate(zip(known, known_keys)):
+            strengths[seat] = rank_keys(board_keys + key, boards, cards)
+        for i in range(opponents):
+            holes = drawn[:, 2 * i:2 * i + 2]
+            keys = board_keys + KEYS[holes].sum(axis=1, dtype=np.uint64)
+            strengths[len(known) + i] = rank_keys(keys, np.concatenate((boards, holes), axis=1))
+
+        on_top = strengths == strengths.max(axis=0)
+        winners = on_top.sum(axis=0)
+        alone = on_top & (winners == 1)
+        wins += alone.sum(axis=1)
+        ties += (on_top & ~alone).sum(axis=1)
+        shares += (on_top / winners).sum(axis=1)
+
+    return [Equity(wins[seat] / trials, ties[seat] / trials, shares[seat] / trials) for seat in range(players)]
@@ -0,0 +1,171 @@
+from card import Cards, CARDS
+from game import MAX_PLAYERS
+from deck import Deck
+from hand import Hand, RANK_CHARS, starting_hand
+from evaluator import strength, hole_cards
+from simulate import simulate
+from jobs import Job
+from functools import lru_cache
+import json
+import os
+import sys
+
+
+# ----------------------------------------------------------------------------
+
+# Equity of every starting hand against 1 to 20 random opponents, every
+# table size game() can deal. Built once by running this file.
+PREFLOP_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "preflop_equity.json")
+PREFLOP_VERSION = 1
+MAX_OPPONENTS = MAX_PLAYERS - 1
+
+
+def canonical_hands() -> list[str]:
+    """
+    The 169 strategically different starting hands, like "AA", "AKs", "AKo".
+    """
+    res = []
+    for high in range(12, -1, -1):
+        for low in range(high, -1, -1):
+            name = RANK_CHARS[high] + RANK_CHARS[low]
+            if high == low:
+                res.append(name)
+            else:
+                res.append(name + "s")
+                res.append(name + "o")
+
+    return res
+
+
+# ----------------------------------------------------------------------------
+
+
+def build_table(
+    games: int, workers: int | None = None, seed: int | None = None, checkpoint: str | None = None,
+) -> dict[str, list[float]]:
+    """
+    Simulates games games for every table size and returns the equity of
+    every starting hand, listed by the number of opponents.
+    Every player of every game counts, so rare hands like pairs still get
+    about games * players * 6 / 1326 samples.
+    With a checkpoint path it runs as a Job, which continues where a killed
+    run stopped.
+    """
+    table: dict[str, list[float]] = {hand: [] for hand in canonical_hands()}
+
+    if checkpoint:
+        job = Job(checkpoint, games, list(range(2, MAX_OPPONENTS + 2)), seed)
+        job.run(workers)
+
+    for opponents in range(1, MAX_OPPONENTS + 1):
+        stats = job.stats[opponents + 1] if checkpoint else simulate(games, opponents + 1, workers, seed)
+        for hand in table:
+            table[hand].append(stats.equity(hand))
+
+    return table
+
+
+def save_table(table: dict[str, list[float]], games: int, path: str = PREFLOP_PATH):
+    tmp = f"{path}.{os.getpid()}.tmp"
+    with open(tmp, "w") as f:
+        json.dump({"version": PREFLOP_VERSION, "games": games, "equity": table}, f)
+    os.replace(tmp, path)
+
+
+def load_table(path: str = PREFLOP_PATH) -> dict[str, list[float]] | None:
+    """
+    Returns the saved table, None if there is none or it is from another
+    version.
+    """
+    try:
+        with open(path) as f:
+            data = json.load(f)
+    except (OSError, ValueError):
+        return None
+
+    if data.get("version") != PREFLOP_VERSION:
+        return None
+    return data["equity"]
+
+
+TABLE = load_table()
+
+
+# ----------------------------------------------------------------------------
+
+
+@lru_cache(maxsize=4096)
+def field_equity(hole: tuple[Cards, Cards], opponents: int, dead: frozenset[Cards] = frozenset(), trials: int = 20000) -> float:
+    """
+    Monte Carlo equity of two exact hole cards against opponents random
+    hands, with the dead cards taken out of the deck.
+    Recently asked questions are kept, so repeated ones cost nothing.
+    """
+    # without burn cards there is room for one more opponent than in game().
+    assert 2 + 2 * opponents + 5 + len(dead) <= 52
+
+    deck = Deck()
+    mine = [card.index for card in hole]
+    total = 0.0
+
+    for _ in range(trials):
+        deck.reset()
+        for card in hole:
+            deck.remove(card)
+        for card in dead:
+            deck.remove(card)
+
+        others = [[deck.deal_code(), deck.deal_code()] for _ in range(opponents)]
+        board = [deck.deal_code() for _ in range(5)]
+
+        best = strength(board + mine)
+        tied = 1
+        for cards in others:
+            value = strength(board + cards)
+            if value > best:
+                break
+            if value == best:
+                tied += 1
+        else:
+            total += 1 / tied
+
+    return total / trials
+
+
+def equity(hand: Hand | tuple[Cards, Cards], opponents: int, dead: list[Cards] = []) -> float:
+    """
+    Equity of a starting hand against opponents random hands.
+    Without dead cards it comes from the precomputed table, otherwise (or
+    without a table) it gets simulated and cached.
+    """
+    assert 1 <= opponents
+    cards = hole_cards(hand)
+
+    if TABLE is not None and not dead and opponents <= MAX_OPPONENTS:
+        return TABLE[starting_hand(cards)][opponents - 1]
+
+    # suits do not matter without dead cards, so all AKo share one entry.
+    if not dead:
+        cards = representative(starting_hand(cards))
+
+    return field_equity(tuple(sorted(cards, key=lambda card: card.index)), opponents, frozenset(dead))
+
+
+def representative(name: str) -> tuple[Cards, Cards]:
+    """
+    One pair of concrete cards for a starting hand name.
+    """
+    high = CARDS[RANK_CHARS.index(name[0]) << 2]
+    low = CARDS[RANK_CHARS.index(name[1]) << 2 | (0 if name.endswith("s") else 1)]
+
+    return (high, low)
+
+
+# ----------------------------------------------------------------------------
+
+
+if __name__ == "__main__":
+    # python preflop.py [games] [checkpoint], the checkpoint makes it resumable.
+    games = int(sys.argv[1]) if len(sys.argv) > 1 else 200000
+    checkpoint = sys.argv[2] if len(sys.argv) > 2 else None
+    save_table(build_table(games, checkpoint=checkpoint), games)
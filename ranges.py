@@ -0,0 +1,241 @@
+from board import Board
+from hand import RANK_CHARS
+from batch import combinations
+from combos import COMBOS, COMBO_INDEX, CARD_COMBOS, board_strengths
+import numpy as np
+
+
+# ----------------------------------------------------------------------------
+
+# Suit letters for single combinations like "AhKd", in the order of Symbols:
+# Heart, Spade, Clover (written d, like diamonds) and Club.
+SUIT_CHARS = "hsdc"
+
+
+# the code of every card by its two letters, "Ah".
+CARD_CODES = {RANK_CHARS[code >> 2] + SUIT_CHARS[code & 3]: code for code in range(52)}
+
+
+def parse_cards(text: str) -> list[int]:
+    """
+    Codes of cards written one after the other, like "AhKd" or "2h7d9c".
+    """
+    text = text.replace(" ", "")
+    try:
+        if len(text) % 2:
+            raise KeyError(text)
+        return [CARD_CODES[text[i:i + 2]] for i in range(0, len(text), 2)]
+    except KeyError:
+        raise ValueError(f"Can't read the cards {text!r}.") from None
+
+
+def card_text(code: int) -> str:
+    return RANK_CHARS[code >> 2] + SUIT_CHARS[code & 3]
+
+
+def class_combos(high: int, low: int, kind: str) -> list[int]:
+    """
+    Combination indexes of one starting hand class, ranks 0 (Two) to 12 (Ace).
+    kind is "s" for suited, "o" for offsuit, "" for both.
+    """
+    res = []
+    for first in range(4):
+        for second in range(4):
+            if high == low and second <= first:
+                continue
+            if kind == "s" and first != second:
+                continue
+            if kind == "o" and first == second:
+                continue
+            res.append(COMBO_INDEX[high << 2 | first, low << 2 | second])
+
+    return res
+
+
+def parse_class(token: str) -> tuple[int, int, str]:
+    """
+    Splits "AKs" into (12, 11, "s"), the higher rank first.
+    """
+    if len(token) not in (2, 3) or token[0] not in RANK_CHARS or token[1] not in RANK_CHARS:
+        raise ValueError(f"Can't read the hand {token!r}.")
+
+    kind = token[2:]
+    if kind not in ("", "s", "o"):
+        raise ValueError(f"Can't read the hand {token!r}.")
+
+    high, low = sorted((RANK_CHARS.index(token[0]), RANK_CHARS.index(token[1])), reverse=True)
+    if high == low and kind:
+        raise ValueError(f"A pair can't be suited or offsuit: {token!r}.")
+
+    return (high, low, kind)
+
+
+def parse_token(token: str) -> list[int]:
+    """
+    Combination indexes of one part of a range, like "AKs", "TT+", "A5s-A2s",
+    "76s-54s" or a single combination "AhKd".
+    """
+    if len(token) == 4 and token[1] in SUIT_CHARS and token[3] in SUIT_CHARS:
+        first = RANK_CHARS.index(token[0]) << 2 | SUIT_CHARS.index(token[1])
+        second = RANK_CHARS.index(token[2]) << 2 | SUIT_CHARS.index(token[3])
+        if first == second:
+            raise ValueError(f"The same card twice: {token!r}.")
+        return [COMBO_INDEX[first, second]]
+
+    classes: list[tuple[int, int]] = []
+
+    if "-" in token:
+        (top, bottom) = (parse_class(part) for part in token.split("-"))
+        if top[2] != bottom[2] or (top[0] == top[1]) != (bottom[0] == bottom[1]):
+            raise ValueError(f"Both ends of {token!r} need the same shape.")
+        if top < bottom:
+            (top, bottom) = (bottom, top)
+        kind = top[2]
+
+        if top[0] == top[1]:
+            # pairs, "TT-77".
+            classes = [(rank, rank) for rank in range(bottom[0], top[0] + 1)]
+        elif top[0] == bottom[0]:
+            # same high card, the kicker walks, "A5s-A2s".
+            classes = [(top[0], low) for low in range(bottom[1], top[1] + 1)]
+        elif top[0] - top[1] == bottom[0] - bottom[1]:
+            # same gap, both walk, "76s-54s".
+            gap = top[0] - top[1]
+            classes = [(high, high - gap) for high in range(bottom[0], top[0] + 1)]
+        else:
+            raise ValueError(f"Can't read the range {token!r}.")
+
+    elif token.endswith("+"):
+        (high, low, kind) = parse_class(token[:-1])
+        if high == low:
+            # "TT+" up to the Aces.
+            classes = [(rank, rank) for rank in range(high, 13)]
+        else:
+            # "ATs+" the kicker goes up to just below the high card.
+            classes = [(high, kicker) for kicker in range(low, high)]
+
+    else:
+        (high, low, kind) = parse_class(token)
+        classes = [(high, low)]
+
+    res = []
+    for high, low in classes:
+        res += class_combos(high, low, kind)
+
+    return res
+
+
+# ----------------------------------------------------------------------------
+
+
+class Range:
+    """
+    A weighted set of hole card combinations, read from the usual notation:
+    comma separated parts like "AKs, TT+, 76s-54s, A5s-A2s, AhKd", each with
+    an optional weight, "AKo:0.5". Later parts overwrite earlier ones.
+    """
+
+    def __init__(self, notation: str = ""):
+        self.weights = np.zeros(len(COMBOS))
+
+        for part in notation.split(","):
+            part = part.strip()
+            if not part:
+                continue
+
+            weight = 1.0
+            if ":" in part:
+                (part, value) = part.split(":")
+                weight = float(value)
+
+            self.weights[parse_token(part.strip())] = weight
+
+
+    def __len__(self) -> int:
+        """
+        Number of combinations in the range.
+        """
+        return int(np.count_nonzero(self.weights))
+
+
+    def combos(self) -> list[tuple[int, int, float]]:
+        """
+        Every combination as (code, code, weight).
+        """
+        return [(int(COMBOS[i, 0]), int(COMBOS[i, 1]), float(self.weights[i])) for i in np.flatnonzero(self.weights)]
+
+
+# ----------------------------------------------------------------------------
+
+# The combinations holding a card, laid out so one searchsorted call handles
+# all 52 cards: every card's part gets its own offset above any strength.
+CARD_OFFSETS = (np.arange(52, dtype=np.int64) << 24)[:, None]
+ROW_STARTS = np.arange(52) * 51
+
+
+def matchups(strengths: np.ndarray, hero: np.ndarray, villain: np.ndarray) -> tuple[float, float]:
+    """
+    Hero's pot share and the total weight of all hero against villain
+    matchups on one complete board. Pairs of combinations sharing a card
+    never meet, which is handled by taking the villain combinations holding
+    either hero card back out.
+    """
+    strengths = strengths.astype(np.int64)
+
+    # against the whole villain range.
+    order = np.argsort(strengths)
+    ordered = strengths[order]
+    cumulative = np.concatenate(([0.0], np.cumsum(villain[order])))
+    low = np.searchsorted(ordered, strengths, "left")
+    high = np.searchsorted(ordered, strengths, "right")
+    less = cumulative[low]
+    equal = cumulative[high] - cumulative[low]
+    total = np.full(len(strengths), cumulative[-1])
+
+    # the same against only the villain combinations holding each card.
+    part = strengths[CARD_COMBOS]
+    order = np.argsort(part, axis=1)
+    ordered = (np.take_along_axis(part, order, axis=1) + CARD_OFFSETS).ravel()
+    weights = np.take_along_axis(villain[CARD_COMBOS], order, axis=1).ravel()
+    cumulative = np.concatenate(([0.0], np.cumsum(weights)))
+    queries = (part + CARD_OFFSETS).ravel()
+    low = np.searchsorted(ordered, queries, "left")
+    high = np.searchsorted(ordered, queries, "right")
+    starts = np.repeat(cumulative[ROW_STARTS], 51)
+    ends = np.repeat(cumulative[ROW_STARTS + 51], 51)
+
+    holders = CARD_COMBOS.ravel()
+    less -= np.bincount(holders, cumulative[low] - starts, len(strengths))
+    equal -= np.bincount(holders, cumulative[high] - cumulative[low], len(strengths))
+    total -= np.bincount(holders, ends - starts, len(strengths))
+
+    # a combination holds both of its cards, so it got taken out twice.
+    equal += villain
+    total += villain
+
+    return (float(hero @ (less + equal / 2)), float(hero @ total))
+
+
+def range_equity(hero: Range, villain: Range, board: Board) -> float:
+    """
+    Hero's equity against villain on a flop, turn or river, going through
+    every remaining runout. Combinations that clash with the board or with
+    each other are left out.
+    """
+    shown = [card.index for card in board.cards]
+    deck = np.array([code for code in range(52) if code not in shown])
+    runouts = deck[combinations(len(deck), 5 - len(shown))]
+
+    share = 0.0
+    total = 0.0
+    for runout in runouts:
+        strengths = board_strengths(shown + runout.tolist())
+        alive = strengths > 0
+        (won, met) = matchups(strengths, hero.weights * alive, villain.weights * alive)
+        share += won
+        total += met
+
+    if total == 0:
+        raise ValueError("The ranges never meet on this board.")
+
+    return share / total
@@ -0,0 +1,141 @@
+from results import Result
+from card import CARDS
+from hand import starting_hand
+from batch import evaluate_batch
+from combos import COMBOS, COMBO_INDEX
+from ranges import parse_cards
+from simulate import Stats, WIN, TIE, LOSS
+import json
+import sys
+import numpy as np
+
+
+# ----------------------------------------------------------------------------
+
+# Hand histories are text, one showdown per line: the 5 board cards, then
+# the hole cards of every player, separated by spaces. Empty lines and
+# lines starting with # are skipped.
+#
+#   2h7d9cTsJs AhKd QsQc 8c8d
+#
+# Lines are read one by one and evaluated this many players at a time, so
+# the size of the file does not matter.
+BATCH_ROWS = 1 << 16
+
+# The starting hand name of every combination, as an index into HAND_NAMES.
+HAND_NAMES = sorted({starting_hand((CARDS[a], CARDS[b])) for a, b in COMBOS.tolist()})
+COMBO_HANDS = np.array([HAND_NAMES.index(starting_hand((CARDS[a], CARDS[b]))) for a, b in COMBOS.tolist()])
+
+RESULTS = list(Result)
+
+
+def parse_line(line: str, number: int) -> list[list[int]] | None:
+    """
+    The board and every hand of one line as code lists, None for lines
+    without a showdown.
+    """
+    line = line.strip()
+    if not line or line.startswith("#"):
+        return None
+
+    try:
+        parts = [parse_cards(token) for token in line.split()]
+    except ValueError as e:
+        raise ValueError(f"Line {number}: {e}") from None
+
+    codes = [code for part in parts for code in part]
+    if len(parts[0]) != 5 or len(parts) < 3 or any(len(part) != 2 for part in parts[1:]):
+        raise ValueError(f"Line {number}: needs 5 board cards and at least two hands of 2 cards.")
+    if len(set(codes)) != len(codes):
+        raise ValueError(f"Line {number}: the same card is used twice.")
+
+    return parts
+
+
+class Replay:
+    """
+    Collects the showdowns of a hand history into Stats: wins, ties and
+    losses by starting hand and by Result, and the pot shares.
+    """
+
+    def __init__(self):
+        self.stats = Stats()
+        self.rows: list[list[int]] = []
+        self.players: list[int] = []
+
+
+    def add(self, parts: list[list[int]]):
+        board = parts[0]
+        for hole in parts[1:]:
+            self.rows.append(board + hole)
+        self.players.append(len(parts) - 1)
+
+        if len(self.rows) >= BATCH_ROWS:
+            self.flush()
+
+
+    def flush(self):
+        """
+        Evaluates all collected showdowns at once and adds them up.
+        """
+        if not self.rows:
+            return
+
+        rows = np.array(self.rows, dtype=np.intp)
+        players = np.array(self.players)
+        starts = np.concatenate(([0], np.cumsum(players)[:-1]))
+        deal = np.repeat(np.arange(len(players)), players)
+
+        (strengths, categories) = evaluate_batch(rows)
+        on_top = strengths == np.maximum.reduceat(strengths, starts)[deal]
+        winners = np.add.reduceat(on_top, starts)[deal]
+        outcome = np.where(on_top, np.where(winners == 1, WIN, TIE), LOSS)
+        hands = COMBO_HANDS[COMBO_INDEX[rows[:, 5], rows[:, 6]]]
+
+        by_hand = np.bincount(hands * 3 + outcome, minlength=len(HAND_NAMES) * 3).reshape(-1, 3)
+        by_result = np.bincount(categories.astype(np.intp) * 3 + outcome, minlength=len(RESULTS) * 3).reshape(-1, 3)
+        pots = np.bincount(hands, on_top / winners, len(HAND_NAMES))
+
+        batch = Stats()
+        batch.games = len(players)
+        for index in np.flatnonzero(by_hand.sum(axis=1)):
+            batch.by_hand[HAND_NAMES[index]] = by_hand[index].tolist()
+            batch.pots[HAND_NAMES[index]] = float(pots[index])
+        for index in np.flatnonzero(by_result.sum(axis=1)):
+            batch.by_result[RESULTS[index]] = by_result[index].tolist()
+        self.stats.merge(batch)
+
+        self.rows = []
+        self.players = []
+
+
+def replay(lines, out: str | None = None) -> Stats:
+    """
+    Replays every showdown of the lines (an open file or any iterable of
+    strings) and returns the Stats, also written to out as JSON if given.
+    """
+    res = Replay()
+    for number, line in enumerate(lines, 1):
+        parts = parse_line(line, number)
+        if parts:
+            res.add(parts)
+    res.flush()
+
+    if out:
+        with open(out, "w") as f:
+            json.dump(res.stats.dump(), f, indent=2)
+
+    return res.stats
+
+
+# ----------------------------------------------------------------------------
+
+
+if __name__ == "__main__":
+    # python replay.py history.txt [stats.json]
+    with open(sys.argv[1]) as f:
+        stats = replay(f, sys.argv[2] if len(sys.argv) > 2 else None)
+
+    print(stats.games, "showdowns")
+    for result in Result:
+        print(result.name, stats.by_result.get(result, [0, 0, 0]))
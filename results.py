@@ -0,0 +1,37 @@
+from enum import Enum
+
+
+# ----------------------------------------------------------------------------
+
+
+class Result(Enum):
+    HighCard = 0
+    Pair = 1
+    TwoPair = 2
+    Triple = 3
+    Straight = 4
+    Flush = 5
+    FullHouse = 6
+    Quads = 7
+    StraightFlush = 8
+    RoyalFlush = 9
+
+
+# ----------------------------------------------------------------------------
+
+
+def straight_high(mask: int) -> int:
+    """
+    Returns the power of the highest straight in a 13 bit rank mask, 0 if
+    there is none. The wheel (A,2,3,4,5) counts as a five high straight.
+    """
+    for high in range(12, 3, -1):
+        window = 0b11111 << (high - 4)
+        if mask & window == window:
+            return high + 2
+
+    # Ace plus 2,3,4,5
+    if mask & 0b1000000001111 == 0b1000000001111:
+        return 5
+
+    return 0
@@ -0,0 +1,432 @@
+from card import CARDS
+from board import Board
+from batch import evaluate_boards
+from exact import exact_equity
+from ranges import parse_cards
+from showdown import best_seats
+from simulate import estimate
+from concurrent.futures import ProcessPoolExecutor
+import argparse
+import asyncio
+import itertools
+import json
+import os
+import numpy as np
+
+
+# ----------------------------------------------------------------------------
+
+# A local equity service. Clients send one JSON request per line and get one
+# JSON reply per line back, matched by "id", not necessarily in order:
+#
+#   {"id": 1, "op": "equity", "hands": ["AhKd", "QsQc"], "board": "2h7d9c"}
+#   {"id": 2, "op": "showdown", "hands": ["AhKd", "QsQc"], "board": "2h7d9cTsJs"}
+#   {"id": 3, "op": "estimate", "hand": "AhKd", "players": 6, "precision": 0.01}
+#
+# Showdowns arriving close together are put into one batch for the worker
+# pool and evaluated in one call, other requests go to the pool one by one.
+# The processes and their mapped tables are reused throughout.
+
+HOST = "127.0.0.1"
+PORT = 7341
+
+# a batch is sent when it is full or its first request waited this long.
+BATCH_SIZE = 64
+BATCH_WINDOW = 0.002
+
+# requests waiting for a batch, above that new ones are turned away.
+MAX_PENDING = 4096
+
+# seconds a request may take before it gets a timeout reply. Clients can
+# ask for less with "timeout", never for more.
+TIMEOUT = 10.0
+
+# a timeout only stops the waiting, the worker still finishes the request,
+# so estimates are kept to a few seconds of work.
+MIN_PRECISION = 0.005
+MAX_ESTIMATE_GAMES = 200000
+
+
+def text(request: dict, name: str, default: str | None = None) -> str:
+    """
+    A field holding cards, which has to be a string like "AhKd".
+    """
+    value = request.get(name, default)
+    if not isinstance(value, str):
+        raise ValueError(f"{name!r} has to be a string of cards like 'AhKd'.")
+    return value
+
+
+def hole_list(request: dict) -> list[tuple]:
+    """
+    The "hands" of a request, at least two of them.
+    """
+    hands = request.get("hands")
+    if not isinstance(hands, list) or not all(isinstance(cards, str) for cards in hands):
+        raise ValueError("'hands' has to be a list of strings like 'AhKd'.")
+    if len(hands) < 2:
+        raise ValueError("At least two hands are needed.")
+    return [hole(cards) for cards in hands]
+
+
+def make_board(codes: list[int]) -> Board | None:
+    if not codes:
+        return None
+    if len(codes) not in (3, 4, 5):
+        raise ValueError("A board has 3 to 5 cards.")
+
+    board = Board([CARDS[code] for code in codes[:3]])
+    for code in codes[3:]:
+        board.run(CARDS[code])
+    return board
+
+
+def hole(cards: str) -> tuple:
+    if not isinstance(cards, str):
+        raise ValueError(f"A hand has to be a string like 'AhKd', not {cards!r}.")
+    codes = parse_cards(cards)
+    if len(codes) != 2:
+        raise ValueError(f"A hand has two cards: {cards!r}.")
+    return (CARDS[codes[0]], CARDS[codes[1]])
+
+
+def run_equity(request: dict) -> dict:
+    hands = hole_list(request)
+    board = make_board(parse_cards(text(request, "board", "")))
+    dead = [CARDS[code] for code in parse_cards(text(request, "dead", ""))]
+
+    result = exact_equity(hands, board, dead)
+    return {"equity": [{"win": e.win, "tie": e.tie, "equity": e.equity} for e in result]}
+
+
+def run_estimate(request: dict) -> dict:
+    players = request.get("players")
+    if isinstance(players, bool) or not isinstance(players, int):
+        raise ValueError(f"'players' has to be a whole number, not {players!r}.")
+
+    res = estimate(
+        hole(request.get("hand")), players,
+        precision=max(MIN_PRECISION, float(request.get("precision", 0.01))),
+        max_games=MAX_ESTIMATE_GAMES, workers=1, seed=request.get("seed"),
+    )
+    return {"equity": res.equity, "interval": res.interval(), "win": res.win, "tie": res.tie, "games": res.games}
+
+
+def run_showdowns(requests: list[dict]) -> list[dict]:
+    """
+    All showdown requests of a batch, evaluated with one evaluate_boards call.
+    """
+    rows = []
+    for request in requests:
+        board = parse_cards(text(request, "board"))
+        if len(board) != 5:
+            raise ValueError("A showdown needs all 5 board cards.")
+        holes = [[card.index for card in cards] for cards in hole_list(request)]
+        codes = board + [code for cards in holes for code in cards]
+        if len(set(codes)) != len(codes):
+            raise ValueError("The same card is used twice.")
+        for cards in holes:
+            rows.append(board + cards)
+
+    (strengths, categories) = evaluate_boards(np.array(rows)[:, :5], np.array(rows)[:, 5:])
+
+    replies = []
+    start = 0
+    for request in requests:
+        end = start + len(request["hands"])
+        values = strengths[start:end].tolist()
+        replies.append({"winners": best_seats(values), "strengths": values, "categories": categories[start:end].tolist()})
+        start = end
+
+    return replies
+
+
+def run_batch(requests: list[dict]) -> list[dict]:
+    """
+    Runs one batch in a worker process. Every request gets a reply, a broken
+    one only fails itself.
+    """
+    replies: list[dict | None] = [None] * len(requests)
+
+    showdowns = [i for i, request in enumerate(requests) if request.get("op") == "showdown"]
+    if showdowns:
+        try:
+            for i, reply in zip(showdowns, run_showdowns([requests[i] for i in showdowns])):
+                replies[i] = reply
+        except Exception:
+            # something in the batch is broken, find out which one on its own.
+            for i in showdowns:
+                try:
+                    replies[i] = run_showdowns([requests[i]])[0]
+                except Exception as e:
+                    replies[i] = {"error": str(e) or type(e).__name__}
+
+    for i, request in enumerate(requests):
+        if replies[i] is not None:
+            continue
+        try:
+            match request.get("op"):
+                case "equity":
+                    replies[i] = run_equity(request)
+                case "estimate":
+                    replies[i] = run_estimate(request)
+                case op:
+                    replies[i] = {"error": f"Unknown op {op!r}."}
+        except Exception as e:
+            replies[i] = {"error": str(e) or type(e).__name__}
+
+    return replies
+
+
+# ----------------------------------------------------------------------------
+
+
+class Service:
+    """
+    The server side: reads requests from every connection, collects them
+    into batches and runs the batches on a pool of worker processes.
+    """
+
+    def __init__(
+        self, workers: int | None = None, batch_size: int = BATCH_SIZE, batch_window: float = BATCH_WINDOW,
+        max_pending: int = MAX_PENDING, timeout: float = TIMEOUT,
+    ):
+        self.workers = workers or os.cpu_count() or 1
+        self.batch_size = batch_size
+        self.batch_window = batch_window
+        self.timeout = timeout
+        self.queue: asyncio.Queue = asyncio.Queue(max_pending)
+        # at most two batches per worker in flight, the rest waits queued.
+        self.slots = asyncio.Semaphore(2 * self.workers)
+        self.pool: ProcessPoolExecutor | None = None
+        self.server: asyncio.Server | None = None
+        self.batcher: asyncio.Task | None = None
+        self.connections: set[asyncio.Task] = set()
+
+
+    async def start(self, host: str = HOST, port: int = PORT, path: str | None = None):
+        """
+        Listens on host and port, or on the Unix socket at path.
+        """
+        self.pool = ProcessPoolExecutor(max_workers=self.workers)
+        self.batcher = asyncio.create_task(self.collect())
+        if path:
+            self.server = await asyncio.start_unix_server(self.connection, path)
+        else:
+            self.server = await asyncio.start_server(self.connection, host, port)
+
+
+    async def close(self):
+        self.server.close()
+        for task in self.connections:
+            task.cancel()
+        await asyncio.gather(*self.connections, return_exceptions=True)
+        await self.server.wait_closed()
+        self.batcher.cancel()
+        self.pool.shutdown(cancel_futures=True)
+
+
+    async def connection(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        tasks = set()
+        me = asyncio.current_task()
+        self.connections.add(me)
+        try:
+            while line := await reader.readline():
+                task = asyncio.create_task(self.answer(line, writer))
+                tasks.add(task)
+                task.add_done_callback(tasks.discard)
+        except (ConnectionError, asyncio.CancelledError):
+            # the client left or the service is closing.
+            pass
+        finally:
+            self.connections.discard(me)
+            for task in tasks:
+                task.cancel()
+            writer.close()
+
+
+    async def answer(self, line: bytes, writer: asyncio.StreamWriter):
+        """
+        Every line gets exactly one reply, whatever is in it.
+        """
+        request = None
+        try:
+            request = json.loads(line)
+            if not isinstance(request, dict):
+                reply = {"error": "A request has to be a JSON object."}
+            else:
+                reply = await self.submit(request)
+        except ValueError as e:
+            reply = {"error": f"Can't read the request: {e}"}
+        except Exception as e:
+            reply = {"error": f"Failed: {e}"}
+
+        reply["id"] = request.get("id") if isinstance(request, dict) else None
+        try:
+            writer.write(json.dumps(reply).encode() + b"\n")
+            await writer.drain()
+        except ConnectionError:
+            # the client is gone, nobody to tell.
+            pass
+
+
+    async def submit(self, request: dict) -> dict:
+        """
+        Queues one request and waits for its reply, or for the timeout.
+        A full queue is answered right away, clients should retry later.
+        """
+        timeout = request.get("timeout", self.timeout)
+        if isinstance(timeout, bool) or not isinstance(timeout, (int, float)) or not timeout > 0:
+            return {"error": f"The timeout has to be a positive number of seconds, not {timeout!r}."}
+        timeout = min(timeout, self.timeout)
+
+        future = asyncio.get_running_loop().create_future()
+        try:
+            self.queue.put_nowait((request, future))
+        except asyncio.QueueFull:
+            return {"error": "busy"}
+
+        try:
+            return await asyncio.wait_for(future, timeout)
+        except asyncio.TimeoutError:
+            return {"error": "timeout"}
+
+
+    async def collect(self):
+        """
+        Takes requests off the queue into batches and sends them off. The
+        showdowns of a batch go to one worker together, they are evaluated
+        in one call. Every other request gets sent on its own, so a slow one
+        only holds up itself.
+        """
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = [await self.queue.get()]
+            deadline = loop.time() + self.batch_window
+            while len(batch) < self.batch_size:
+                try:
+                    batch.append(await asyncio.wait_for(self.queue.get(), deadline - loop.time()))
+                except asyncio.TimeoutError:
+                    break
+
+            # requests that timed out already are not worth running.
+            batch = [(request, future) for request, future in batch if not future.done()]
+            if not batch:
+                continue
+
+            showdowns = [item for item in batch if item[0].get("op") == "showdown"]
+            others = [[item] for item in batch if item[0].get("op") != "showdown"]
+            for part in ([showdowns] if showdowns else []) + others:
+                await self.slots.acquire()
+                asyncio.create_task(self.dispatch(part))
+
+
+    async def dispatch(self, batch: list[tuple[dict, asyncio.Future]]):
+        try:
+            requests = [request for request, _ in batch]
+            replies = await asyncio.get_running_loop().run_in_executor(self.pool, run_batch, requests)
+        except Exception as e:
+            replies = [{"error": f"Worker failed: {e}"}] * len(batch)
+        finally:
+            self.slots.release()
+
+        for (_, future), reply in zip(batch, replies):
+            if not future.done():
+                future.set_result(dict(reply))
+
+
+# ----------------------------------------------------------------------------
+
+
+class Client:
+    """
+    Talks to a running Service:
+        client = await Client.connect()
+        await client.equity(["AhKd", "QsQc"], board="2h7d9c")
+    Any number of requests can be awaited at the same time.
+    """
+
+    def __init__(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        self.reader = reader
+        self.writer = writer
+        self.ids = itertools.count()
+        self.waiting: dict[int, asyncio.Future] = {}
+        self.listener = asyncio.create_task(self.listen())
+
+
+    @classmethod
+    async def connect(cls, host: str = HOST, port: int = PORT, path: str | None = None) -> "Client":
+        if path:
+            (reader, writer) = await asyncio.open_unix_connection(path)
+        else:
+            (reader, writer) = await asyncio.open_connection(host, port)
+        return cls(reader, writer)
+
+
+    async def listen(self):
+        while line := await self.reader.readline():
+            reply = json.loads(line)
+            future = self.waiting.pop(reply.pop("id"), None)
+            if future and not future.done():
+                future.set_result(reply)
+
+        # the server went away, nobody gets an answer anymore.
+        for future in self.waiting.values():
+            if not future.done():
+                future.set_exception(ConnectionError("The service closed the connection."))
+
+
+    async def request(self, op: str, **params) -> dict:
+        """
+        Sends one request and returns its reply. Errors of the service come
+        back as a ValueError.
+        """
+        id = next(self.ids)
+        future = asyncio.get_running_loop().create_future()
+        self.waiting[id] = future
+        self.writer.write(json.dumps({"id": id, "op": op, **params}).encode() + b"\n")
+        await self.writer.drain()
+
+        reply = await future
+        if "error" in reply:
+            raise ValueError(reply["error"])
+        return reply
+
+
+    async def equity(self, hands: list[str], board: str = "", dead: str = "") -> list[dict]:
+        return (await self.request("equity", hands=hands, board=board, dead=dead))["equity"]
+
+
+    async def showdown(self, hands: list[str], board: str) -> dict:
+        return await self.request("showdown", hands=hands, board=board)
+
+
+    async def estimate(self, hand: str, players: int, precision: float = 0.01) -> dict:
+        return await self.request("estimate", hand=hand, players=players, precision=precision)
+
+
+    async def close(self):
+        self.listener.cancel()
+        self.writer.close()
+        await self.writer.wait_closed()
+
+
+# ----------------------------------------------------------------------------
+
+
+async def serve(workers: int | None, host: str, port: int, path: str | None):
+    service = Service(workers)
+    await service.start(host, port, path)
+    async with service.server:
+        await service.server.serve_forever()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Runs the local equity service.")
+    parser.add_argument("--host", default=HOST)
+    parser.add_argument("--port", type=int, default=PORT)
+    parser.add_argument("--unix", help="listen on this Unix socket instead of TCP")
+    parser.add_argument("--workers", type=int, help="worker processes, all cores by default")
+    args = parser.parse_args()
+
+    asyncio.run(serve(args.workers, args.host, args.port, args.unix))
@@ -0,0 +1,117 @@
+from board import Board
+from hand import Hand
+from results import Result
+from evaluator import BoardEval, Evaluation, category, hole_cards
+
+try:
+    from combos import COMBO_INDEX, cached_strengths
+except ImportError:
+    # without NumPy there is no board cache, every hand gets evaluated.
+    cached_strengths = None
+
+
+# ----------------------------------------------------------------------------
+
+
+class Showdown:
+    """
+    Outcome of one showdown. Players are referred to by their seat, the
+    index in the list of hands.
+    winners holds every seat sharing the best hand, so more than one means a
+    split pot. order (best first) and groups (seats with the same strength,
+    best group first) are only there if the full ordering was asked for.
+    """
+
+    def __init__(self, hands: list[Hand], strengths: list[int], winners: list[int], board: Board | None = None):
+        # the board codes as they were at the showdown, not the live board.
+        self.board_codes = tuple(card.index for card in board.cards) if board else ()
+        self.hands = hands
+        self.strengths = strengths
+        self.winners = winners
+        self.order: list[int] | None = None
+        self.groups: list[list[int]] | None = None
+
+
+    def result(self, seat: int) -> Result:
+        return category(self.strengths[seat])
+
+
+    def evaluation(self, seat: int) -> Evaluation:
+        """
+        The seat's hand with its best cards, picked out only when looked at.
+        """
+        (first, second) = hole_cards(self.hands[seat])
+        return Evaluation(self.strengths[seat], self.board_codes + (first.index, second.index))
+
+
+    def rank(self):
+        """
+        Sorts the seats by strength and groups equal ones, once.
+        """
+        if self.order is not None:
+            return
+
+        strengths = self.strengths
+        self.order = sorted(range(len(strengths)), key=strengths.__getitem__, reverse=True)
+
+        self.groups = []
+        previous = -1
+        for seat in self.order:
+            if strengths[seat] != previous:
+                self.groups.append([])
+                previous = strengths[seat]
+            self.groups[-1].append(seat)
+
+
+# ----------------------------------------------------------------------------
+
+
+def best_seats(strengths: list[int]) -> list[int]:
+    """
+    All seats with the highest strength, in one pass.
+    """
+    best = -1
+    seats: list[int] = []
+    for seat, value in enumerate(strengths):
+        if value > best:
+            best = value
+            seats = [seat]
+        elif value == best:
+            seats.append(seat)
+
+    return seats
+
+
+def hand_strengths(board: Board, hands: list[Hand]) -> list[int]:
+    """
+    Strength of every hand. Boards that come back (or that ranges have
+    computed already) are answered from the board cache.
+    """
+    if cached_strengths is not None:
+        cached = cached_strengths([card.index for card in board.cards])
+        if cached is not None:
+            return [int(cached[COMBO_INDEX[a.index, b.index]]) for a, b in map(hole_cards, hands)]
+
+    state = BoardEval(board)
+    return [state.strength(hand) for hand in hands]
+
+
+def showdown(board: Board, hands: list[Hand], full: bool = True) -> Showdown:
+    """
+    Ranks every hand on the full board, computing each strength only once.
+    Without full only the winners get determined, which skips the sort.
+    """
+    strengths = hand_strengths(board, hands)
+    res = Showdown(hands, strengths, best_seats(strengths), board)
+
+    if full:
+        res.rank()
+
+    return res
+
+
+def winners(board: Board, hands: list[Hand]) -> list[int]:
+    """
+    Only the seats that win or split the pot.
+    """
+    return best_seats(hand_strengths(board, hands))
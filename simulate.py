@@ -0,0 +1,309 @@
+from game import game, check_players, MAX_PLAYERS, Result
+from deck import Deck
+from evaluator import category, hole_cards
+from showdown import showdown
+from hand import starting_hand
+from streams import Stream, fresh_seed
+from card import Cards
+from concurrent.futures import ProcessPoolExecutor
+from statistics import NormalDist
+import math
+import os
+import time
+
+
+# ----------------------------------------------------------------------------
+
+# Index of the counters in every [wins, ties, losses] list.
+WIN = 0
+TIE = 1
+LOSS = 2
+
+
+class Stats:
+    """
+    Win, tie and loss counts of many games, once by starting hand ("AKs")
+    and once by the Result the player ended up with.
+    A tie means the pot was split with at least one other player.
+    pots sums up the share of the pot every starting hand got.
+    """
+
+    def __init__(self):
+        self.games = 0
+        self.by_hand: dict[str, list[int]] = {}
+        self.by_result: dict[Result, list[int]] = {}
+        self.pots: dict[str, float] = {}
+
+
+    def add(self, hand: str, result: Result, outcome: int, share: float = 0.0):
+        self.by_hand.setdefault(hand, [0, 0, 0])[outcome] += 1
+        self.by_result.setdefault(result, [0, 0, 0])[outcome] += 1
+        self.pots[hand] = self.pots.get(hand, 0.0) + share
+
+
+    def merge(self, other: "Stats"):
+        """
+        Adds the counts of other into this one.
+        """
+        self.games += other.games
+        for hand, counts in other.by_hand.items():
+            mine = self.by_hand.setdefault(hand, [0, 0, 0])
+            for i in range(3):
+                mine[i] += counts[i]
+        for result, counts in other.by_result.items():
+            mine = self.by_result.setdefault(result, [0, 0, 0])
+            for i in range(3):
+                mine[i] += counts[i]
+        for hand, share in other.pots.items():
+            self.pots[hand] = self.pots.get(hand, 0.0) + share
+
+
+    def dump(self) -> dict:
+        """
+        The counts as plain dicts, for json.
+        """
+        return {
+            "games": self.games,
+            "by_hand": self.by_hand,
+            "by_result": {result.name: counts for result, counts in self.by_result.items()},
+            "pots": self.pots,
+        }
+
+
+    @classmethod
+    def load(cls, data: dict) -> "Stats":
+        stats = cls()
+        stats.games = data["games"]
+        stats.by_hand = {hand: list(counts) for hand, counts in data["by_hand"].items()}
+        stats.by_result = {Result[name]: list(counts) for name, counts in data["by_result"].items()}
+        stats.pots = dict(data["pots"])
+        return stats
+
+
+    def equity(self, hand: str) -> float:
+        """
+        Average share of the pot won by a starting hand.
+        Only an estimate for hands seen in different table sizes.
+        """
+        total = sum(self.by_hand.get(hand, []))
+        return self.pots.get(hand, 0.0) / total if total else 0.0
+
+
+# ----------------------------------------------------------------------------
+
+# Games are played in batches of this size, every batch has its own random
+# stream, so results only depend on the seed and not on the worker count.
+BATCH = 10000
+
+
+def play(players: int, stats: Stats, deck: Deck | None = None):
+    """
+    Plays one game() and adds every player's outcome to stats.
+    """
+    (board, hands) = game(players, deck)
+    res = showdown(board, hands, full=False)
+    share = 1 / len(res.winners)
+    outcome = WIN if len(res.winners) == 1 else TIE
+
+    for seat, (hand, value) in enumerate(zip(hands, res.strengths)):
+        if seat in res.winners:
+            stats.add(starting_hand(hole_cards(hand)), category(value), outcome, share)
+        else:
+            stats.add(starting_hand(hole_cards(hand)), category(value), LOSS)
+
+    stats.games += 1
+
+
+def run_shard(games: int, players: int | None, seed: int, index: int = 0) -> Stats:
+    """
+    Runs one batch of games in the current process, with the random stream
+    number index of seed, so it is reproducible and independent of the
+    other batches. Without players, every game picks 2 to MAX_PLAYERS
+    players like analyze().
+    """
+    if players:
+        check_players(players)
+    rng = Stream(seed, index)
+    stats = Stats()
+    deck = Deck(rng)
+
+    for _ in range(games):
+        play(players if players else rng.randint(2, MAX_PLAYERS), stats, deck)
+
+    return stats
+
+
+def simulate(games: int, players: int | None = None, workers: int | None = None, seed: int | None = None) -> Stats:
+    """
+    Runs games random games spread over workers processes (all cores by
+    default) and returns the merged Stats.
+    The games are split into batches of BATCH, each with its own stream of
+    seed, so the same seed gives the same result for any worker count.
+    """
+    if players:
+        check_players(players)
+    workers = workers or os.cpu_count() or 1
+    if seed is None:
+        seed = fresh_seed()
+    batches = [min(BATCH, games - start) for start in range(0, games, BATCH)]
+    indexes = list(range(len(batches)))
+
+    result = Stats()
+    if workers == 1 or len(batches) == 1:
+        for size, index in zip(batches, indexes):
+            result.merge(run_shard(size, players, seed, index))
+        return result
+
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        for stats in pool.map(run_shard, batches, [players] * len(batches), [seed] * len(batches), indexes):
+            result.merge(stats)
+
+    return result
+
+
+# ----------------------------------------------------------------------------
+
+
+class Estimate:
+    """
+    Running results of one hand in many games: how often it won alone, tied
+    and the sum (and sum of squares) of the pot shares it got, which gives
+    the equity and its confidence interval.
+    """
+
+    def __init__(self):
+        self.games = 0
+        self.wins = 0
+        self.ties = 0
+        self.shares = 0.0
+        self.squares = 0.0
+        self.elapsed = 0.0
+        self.converged = False
+
+
+    def add(self, share: float):
+        self.games += 1
+        if share == 1.0:
+            self.wins += 1
+        elif share > 0.0:
+            self.ties += 1
+        self.shares += share
+        self.squares += share * share
+
+
+    def merge(self, other: "Estimate"):
+        self.games += other.games
+        self.wins += other.wins
+        self.ties += other.ties
+        self.shares += other.shares
+        self.squares += other.squares
+
+
+    @property
+    def equity(self) -> float:
+        return self.shares / self.games if self.games else 0.0
+
+
+    @property
+    def win(self) -> float:
+        return self.wins / self.games if self.games else 0.0
+
+
+    @property
+    def tie(self) -> float:
+        return self.ties / self.games if self.games else 0.0
+
+
+    def interval(self, confidence: float = 0.95) -> float:
+        """
+        Half width of the normal confidence interval of the equity.
+        """
+        if self.games < 2:
+            return math.inf
+        z = NormalDist().inv_cdf(0.5 + confidence / 2)
+        variance = max(self.squares / self.games - self.equity ** 2, 0.0)
+        return z * math.sqrt(variance / (self.games - 1))
+
+
+    def __repr__(self) -> str:
+        return (
+            f"Estimate(equity={self.equity:.4f} +- {self.interval():.4f}, win={self.win:.4f}, "
+            f"tie={self.tie:.4f}, games={self.games}, elapsed={self.elapsed:.2f}s)"
+        )
+
+
+def run_estimate(games: int, hole: tuple[Cards, Cards], players: int, seed: int, index: int) -> Estimate:
+    """
+    Plays one batch of games with hole as the known hand of seat 0 and
+    records its pot share. Same streams as run_shard.
+    """
+    rng = Stream(seed, index)
+    deck = Deck(rng)
+    res = Estimate()
+
+    for _ in range(games):
+        (board, hands) = game(players, deck, known=[hole])
+        seats = showdown(board, hands, full=False).winners
+        res.add(1 / len(seats) if seats[0] == 0 else 0.0)
+
+    return res
+
+
+def estimate(
+    hand, players: int, precision: float = 0.002, confidence: float = 0.95,
+    max_games: int = 10 ** 8, workers: int | None = None, seed: int | None = None,
+) -> Estimate:
+    """
+    Equity of a hand against players - 1 random hands, simulated in batches
+    of BATCH until the confidence interval is within +- precision (or
+    max_games are played). The interval gets checked after every batch in
+    order, so the same seed stops at the same game for any worker count.
+    """
+    check_players(players)
+    if not precision > 0 or not 0 < confidence < 1:
+        raise ValueError(f"precision has to be above 0 and confidence between 0 and 1, not {precision} and {confidence}.")
+
+    start = time.perf_counter()
+    hole = hole_cards(hand)
+    workers = workers or os.cpu_count() or 1
+    if seed is None:
+        seed = fresh_seed()
+
+    res = Estimate()
+    index = 0
+    pool = ProcessPoolExecutor(max_workers=workers) if workers > 1 else None
+
+    try:
+        while res.games < max_games and not res.converged:
+            # one batch for every worker, the ones after the stop are wasted.
+            # the last batches are cut so no more than max_games get played.
+            sizes = [min(BATCH, max_games - res.games - i * BATCH) for i in range(workers)]
+            sizes = [size for size in sizes if size > 0]
+            indexes = list(range(index, index + len(sizes)))
+            index += len(sizes)
+            count = len(sizes)
+            args = (sizes, [hole] * count, [players] * count, [seed] * count, indexes)
+            batches = pool.map(run_estimate, *args) if pool else map(run_estimate, *args)
+
+            for batch in batches:
+                res.merge(batch)
+                if res.interval(confidence) <= precision or res.games >= max_games:
+                    res.converged = res.interval(confidence) <= precision
+                    break
+    finally:
+        if pool:
+            pool.shutdown(cancel_futures=True)
+
+    res.elapsed = time.perf_counter() - start
+    return res
+
+
+# ----------------------------------------------------------------------------
+
+
+if __name__ == "__main__":
+    stats = simulate(100000)
+    for hand in sorted(stats.by_hand, key=stats.equity, reverse=True)[:10]:
+        print(hand, round(stats.equity(hand), 4), stats.by_hand[hand])
+    for result in Result:
+        print(result.name, stats.by_result.get(result, [0, 0, 0]))
@@ -0,0 +1,52 @@
+from itertools import chain
+import numpy as np
+
+
+# ----------------------------------------------------------------------------
+
+# Random numbers are drawn this many at a time.
+BLOCK = 1 << 16
+
+
+def generator(seed: int, index: int) -> np.random.Generator:
+    """
+    The independent generator number index of a seed. It is a counter based
+    Philox keyed by SeedSequence(seed).spawn(...)[index], so any stream can
+    be made on its own, in any process, without going through the others.
+    """
+    sequence = np.random.SeedSequence(seed, spawn_key=(index,))
+    return np.random.Generator(np.random.Philox(sequence))
+
+
+def fresh_seed() -> int:
+    """
+    A new seed from the OS, for runs that don't ask for one.
+    """
+    return int(np.random.SeedSequence().entropy)
+
+
+class Stream:
+    """
+    A random stream for the Deck and game(), like random.Random it has
+    random() and randint(). The floats are drawn in blocks of BLOCK with one
+    NumPy call, random() just hands them out one by one.
+    """
+
+    def __init__(self, seed: int, index: int = 0):
+        self.seed = seed
+        self.index = index
+        self.generator = generator(seed, index)
+        # __next__ of the chained blocks runs in C, about as cheap as random.random.
+        self.random = chain.from_iterable(self.blocks()).__next__
+
+
+    def blocks(self):
+        while True:
+            yield self.generator.random(BLOCK).tolist()
+
+
+    def randint(self, low: int, high: int) -> int:
+        """
+        Random integer from low to high, both included.
+        """
+        return low + int(self.random() * (high - low + 1))
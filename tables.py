@@ -0,0 +1,258 @@
+from results import Result, straight_high
+from array import array
+import mmap
+import os
+import struct
+import zlib
+
+
+# ----------------------------------------------------------------------------
+
+# The rank tables are computed once by running this file and saved next to it.
+# Every process maps the same file read only, so all workers share the pages.
+TABLES_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "hand_ranks.bin")
+
+# Bump the version whenever the strength packing or the table layout changes,
+# old files are then rebuilt instead of silently used.
+TABLES_VERSION = 1
+MAGIC = b"PKRT"
+
+# magic, version, buckets, table bits, payload bytes, crc32 of the payload.
+HEADER = struct.Struct("<4sIIIII")
+
+
+# ----------------------------------------------------------------------------
+
+# Strengths are packed as category << 20 followed by up to five rank nibbles
+# (power 2 to 14), most important first. Bigger int is the better hand.
+CATEGORY_SHIFT = 20
+
+
+# ----------------------------------------------------------------------------
+
+
+def pack(result: Result, powers: list[int]) -> int:
+    """
+    Packs the result category and the deciding card powers into one int.
+    """
+    strength = result.value
+    for i in range(5):
+        strength = strength << 4 | (powers[i] if i < len(powers) else 0)
+
+    return strength
+
+
+# ----------------------------------------------------------------------------
+
+
+def best_of_counts(counts: list[int]) -> int:
+    """
+    Strength of the best five cards out of a hand without a flush, given only
+    how often every rank (index 0 to 12) appears.
+    """
+    mask = 0
+    quads, trips, pairs, singles = [], [], [], []
+    for rank in range(12, -1, -1):
+        amount = counts[rank]
+        if amount:
+            mask |= 1 << rank
+        if amount == 4:
+            quads.append(rank + 2)
+        elif amount == 3:
+            trips.append(rank + 2)
+        elif amount == 2:
+            pairs.append(rank + 2)
+        elif amount == 1:
+            singles.append(rank + 2)
+
+    def kickers(*used: int) -> list[int]:
+        # all present powers, highest first, without the used ones.
+        return [r + 2 for r in range(12, -1, -1) if mask >> r & 1 and r + 2 not in used]
+
+    if quads:
+        return pack(Result.Quads, [quads[0]] + kickers(quads[0])[:1])
+
+    if trips and len(trips) + len(pairs) >= 2:
+        pair = max(trips[1:] + pairs)
+        return pack(Result.FullHouse, [trips[0], pair])
+
+    high = straight_high(mask)
+    if high:
+        return pack(Result.Straight, [high])
+
+    if trips:
+        return pack(Result.Triple, [trips[0]] + kickers(trips[0])[:2])
+
+    if len(pairs) >= 2:
+        return pack(Result.TwoPair, pairs[:2] + kickers(*pairs[:2])[:1])
+
+    if pairs:
+        return pack(Result.Pair, [pairs[0]] + kickers(pairs[0])[:3])
+
+    return pack(Result.HighCard, singles[:5])
+
+
+def best_of_flush(mask: int) -> int:
+    """
+    Strength of the best five cards of one suit, given as a 13 bit rank mask
+    with at least five bits set.
+    """
+    high = straight_high(mask)
+    if high == 14:
+        return pack(Result.RoyalFlush, [high])
+    if high:
+        return pack(Result.StraightFlush, [high])
+
+    return pack(Result.Flush, [r + 2 for r in range(12, -1, -1) if mask >> r & 1][:5])
+
+
+# ----------------------------------------------------------------------------
+
+# The rank keys are sparse (base 5 numbers up to 5 ** 13), so they get packed
+# into a small dense table by hash and displace: every key falls into one of
+# BUCKETS buckets, and every bucket got an offset chosen so that no two keys
+# of the whole table land on the same slot.
+# A lookup is then RANK_TABLE[(key + OFFSETS[key % BUCKETS]) & TABLE_MASK].
+BUCKETS = 32767
+TABLE_BITS = 17
+TABLE_MASK = (1 << TABLE_BITS) - 1
+
+
+def rank_counts(size: int):
+    """
+    Yields every rank count vector with size cards in total and at most four
+    cards of each rank.
+    """
+    counts = [0] * 13
+
+    def fill(rank: int, left: int):
+        if rank == 12:
+            if left <= 4:
+                counts[12] = left
+                yield counts
+            return
+
+        for amount in range(min(4, left) + 1):
+            counts[rank] = amount
+            yield from fill(rank + 1, left - amount)
+
+        counts[rank] = 0
+
+    yield from fill(0, size)
+
+
+def build_tables() -> tuple[array, array, array]:
+    """
+    Computes the lookup tables from scratch.
+    Returns the flush table (indexed by the suited rank mask), the bucket
+    offsets and the rank table, for every hand of 5 to 7 cards.
+    """
+    flush = array("I", [0] * 8192)
+    for mask in range(8192):
+        if mask.bit_count() >= 5:
+            flush[mask] = best_of_flush(mask)
+
+    # group all keys by buckets.
+    buckets: dict[int, list[tuple[int, int]]] = {}
+    for size in (5, 6, 7):
+        for counts in rank_counts(size):
+            key = 0
+            for rank in range(12, -1, -1):
+                key = key * 5 + counts[rank]
+            buckets.setdefault(key % BUCKETS, []).append((key, best_of_counts(counts)))
+
+    # place the fullest buckets first, every bucket at the first offset that fits.
+    offsets = array("I", [0] * BUCKETS)
+    table = array("I", [0] * (TABLE_MASK + 1))
+    taken = bytearray(TABLE_MASK + 1)
+    for bucket in sorted(buckets, key=lambda b: len(buckets[b]), reverse=True):
+        entries = buckets[bucket]
+
+        # two keys of the same bucket would move together forever.
+        slots = {key & TABLE_MASK for key, _ in entries}
+        assert len(slots) == len(entries)
+
+        offset = 0
+        while any(taken[(key + offset) & TABLE_MASK] for key, _ in entries):
+            offset += 1
+
+        for key, value in entries:
+            taken[(key + offset) & TABLE_MASK] = 1
+            table[(key + offset) & TABLE_MASK] = value
+        offsets[bucket] = offset
+
+    return (flush, offsets, table)
+
+
+# ----------------------------------------------------------------------------
+
+
+def write_tables(path: str = TABLES_PATH) -> None:
+    """
+    Builds the tables and writes them to path.
+    The file is written next to the target and then renamed, so a reader
+    never sees half of a file, even with many workers starting at once.
+    """
+    flush, offsets, table = build_tables()
+    payload = flush.tobytes() + offsets.tobytes() + table.tobytes()
+    header = HEADER.pack(MAGIC, TABLES_VERSION, BUCKETS, TABLE_BITS, len(payload), zlib.crc32(payload))
+
+    tmp = f"{path}.{os.getpid()}.tmp"
+    with open(tmp, "wb") as f:
+        f.write(header)
+        f.write(payload)
+    os.replace(tmp, path)
+
+
+def read_tables(path: str = TABLES_PATH) -> tuple[memoryview, memoryview, memoryview]:
+    """
+    Maps the table file read only and returns the flush table, the bucket
+    offsets and the rank table as views into the mapping.
+    Raises ValueError if the file is stale or broken.
+    """
+    with open(path, "rb") as f:
+        mapping = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+    if len(mapping) < HEADER.size:
+        raise ValueError(f"{path} is too short for a table file.")
+
+    magic, version, buckets, table_bits, size, checksum = HEADER.unpack_from(mapping)
+    if (magic, version, buckets, table_bits) != (MAGIC, TABLES_VERSION, BUCKETS, TABLE_BITS):
+        raise ValueError(f"{path} was built for another table layout.")
+
+    payload = memoryview(mapping)[HEADER.size:]
+    if len(payload) != size or zlib.crc32(payload) != checksum:
+        raise ValueError(f"{path} is damaged, checksum does not match.")
+
+    words = payload.cast("I")
+    flush = words[:8192]
+    offsets = words[8192:8192 + BUCKETS]
+    table = words[8192 + BUCKETS:]
+
+    assert len(table) == TABLE_MASK + 1
+
+    return (flush, offsets, table)
+
+
+def load_tables(path: str = TABLES_PATH) -> tuple[memoryview, memoryview, memoryview] | tuple[array, array, array]:
+    """
+    Returns the mapped tables, (re)building the file if it is missing or stale.
+    If the file can not be written at all, the tables are kept in memory.
+    """
+    try:
+        return read_tables(path)
+    except (OSError, ValueError):
+        pass
+
+    try:
+        write_tables(path)
+        return read_tables(path)
+    except OSError:
+        return build_tables()
+
+
+# ----------------------------------------------------------------------------
+
+
+if __name__ == "__main__":
+    write_tables()
@@ -0,0 +1,920 @@
+from results import Result
+from evaluator import strength, category, evaluate, best_cards, Evaluation
+from game import MAX_PLAYERS
+from board import Board
+from exact import exact_equity
+from deck import Deck
+from card import CARDS, Cards
+from dataset import DealWriter, DealReader, record
+from showdown import showdown, winners
+from combos import COMBOS, COMBO_INDEX
+from canon import PERMUTATIONS, permute, canonical_codes, canonical_flops, restore
+from batch import DEAL_BLOCK, shuffle_prefix, deal_games, deal_strengths
+from multiway import multiway_equity
+from unittest import mock
+from replay import replay
+from simulate import simulate, run_shard, estimate, play, BATCH, Stats
+from ranges import Range, range_equity, parse_cards, card_text
+import asyncio
+import combos
+import game
+import importlib
+import instrument
+import itertools
+import jobs
+import json
+import numpy as np
+import os
+import pickle
+import random
+import service
+import sys
+import tempfile
+import unittest
+
+
+# ----------------------------------------------------------------------------
+
+# Run with python -m unittest test (or python -m pytest test.py).
+
+
+def five(codes: list[int]) -> tuple:
+    """
+    Slow but obvious rank of exactly five codes, as a comparable tuple.
+    """
+    ranks = sorted((code >> 2 for code in codes), reverse=True)
+    flush = len({code & 3 for code in codes}) == 1
+
+    distinct = sorted(set(ranks), reverse=True)
+    straight = 0
+    if len(distinct) == 5 and distinct[0] - distinct[4] == 4:
+        straight = distinct[0]
+    elif distinct == [12, 3, 2, 1, 0]:
+        straight = 3
+
+    groups = sorted(((ranks.count(rank), rank) for rank in distinct), reverse=True)
+    shape = [size for size, _ in groups]
+    order = tuple(rank for _, rank in groups)
+
+    if straight and flush:
+        return (9 if straight == 12 else 8, (straight,))
+    if shape[0] == 4:
+        return (7, order)
+    if shape[:2] == [3, 2]:
+        return (6, order)
+    if flush:
+        return (5, tuple(ranks))
+    if straight:
+        return (4, (straight,))
+    if shape[0] == 3:
+        return (3, order)
+    if shape[:2] == [2, 2]:
+        return (2, order)
+    if shape[0] == 2:
+        return (1, order)
+    return (0, tuple(ranks))
+
+
+def best(codes: list[int]) -> tuple:
+    return max(five(list(cards)) for cards in itertools.combinations(codes, 5))
+
+
+# ----------------------------------------------------------------------------
+
+
+class TestStrength(unittest.TestCase):
+
+    def test_against_best_five_of_seven(self):
+        rng = random.Random(1)
+        hands = [rng.sample(range(52), 7) for _ in range(3000)]
+        values = [strength(codes) for codes in hands]
+        references = [best(codes) for codes in hands]
+
+        for value, reference in zip(values, references):
+            self.assertEqual(category(value), Result(reference[0]))
+
+        # same order as the reference, ties included.
+        for i in range(len(hands) - 1):
+            a = (values[i], values[i + 1])
+            b = (references[i], references[i + 1])
+            self.assertEqual(a[0] < a[1], b[0] < b[1])
+            self.assertEqual(a[0] == a[1], b[0] == b[1])
+
+
+    def test_wheel_and_royal(self):
+        self.assertEqual(category(strength(parse_cards("Ah2s3d4c5h9sJd"))), Result.Straight)
+        self.assertLess(strength(parse_cards("Ah2s3d4c5h9sJd")), strength(parse_cards("2s3d4c5h6hJdKs")))
+        self.assertEqual(category(strength(parse_cards("AsKsQsJsTs2h3h"))), Result.RoyalFlush)
+
+
+    def test_game_evaluate_uses_the_tables(self):
+        rng = random.Random(2)
+        for _ in range(500):
+            (board, hands) = game.game(rng.randint(2, 9), rng=rng)
+            for hand in hands:
+                res = game.evaluate(board, hand)
+                codes = [card.index for card in board.cards] + [card.index for card in hand]
+                self.assertEqual(res.strength, strength(codes))
+                self.assertEqual(res[0], category(res.strength))
+
+
+# ----------------------------------------------------------------------------
+
+
+class TestSimulate(unittest.TestCase):
+
+    def test_same_seed_any_worker_count(self):
+        one = simulate(12000, players=3, workers=1, seed=7)
+        two = simulate(12000, players=3, workers=2, seed=7)
+        self.assertEqual(one.games, 12000)
+        self.assertEqual(one.dump(), two.dump())
+        self.assertEqual(sum(sum(counts) for counts in one.by_hand.values()), 3 * 12000)
+
+
+    def test_table_sizes(self):
+        self.assertEqual(simulate(50, players=MAX_PLAYERS, workers=1, seed=1).games, 50)
+        for players in (1, MAX_PLAYERS + 1):
+            with self.assertRaises(ValueError):
+                simulate(50, players=players, workers=1)
+            with self.assertRaises(ValueError):
+                run_shard(50, players, 1)
+
+
+# ----------------------------------------------------------------------------
+
+
+def make_board(text: str) -> Board:
+    codes = parse_cards(text)
+    board = Board([CARDS[code] for code in codes[:3]])
+    for code in codes[3:]:
+        board.run(CARDS[code])
+    return board
+
+
+def hand(text: str) -> tuple:
+    return tuple(CARDS[code] for code in parse_cards(text))
+
+
+def brute_equity(hands: list[tuple], board: list[int]) -> list[float]:
+    """
+    Pot shares of the hands over every runout, without any shortcut.
+    """
+    holes = [[card.index for card in cards] for cards in hands]
+    used = board + [code for cards in holes for code in cards]
+    deck = [code for code in range(52) if code not in used]
+
+    shares = [0.0] * len(hands)
+    runouts = list(itertools.combinations(deck, 5 - len(board)))
+    for runout in runouts:
+        values = [strength(board + list(runout) + cards) for cards in holes]
+        top = max(values)
+        winners = [seat for seat, value in enumerate(values) if value == top]
+        for seat in winners:
+            shares[seat] += 1 / len(winners)
+
+    return [share / len(runouts) for share in shares]
+
+
+class TestExact(unittest.TestCase):
+
+    def test_against_every_runout(self):
+        for (board, hands) in [
+            ("2h7d9c", ["AhKd", "QsQc"]),
+            ("Ts9s2d", ["AsKs", "JhTh", "8c7c"]),
+            ("2h7d9cTs", ["AhKd", "QsQc", "8h8s"]),
+            ("5h5d5c", ["5sAh", "KdKc"]),
+        ]:
+            cards = [hand(text) for text in hands]
+            result = exact_equity(cards, make_board(board))
+            expected = brute_equity(cards, parse_cards(board))
+            for equity, share in zip(result, expected):
+                self.assertAlmostEqual(equity.equity, share, places=9)
+            self.assertAlmostEqual(sum(equity.equity for equity in result), 1.0, places=9)
+
+
+# ----------------------------------------------------------------------------
+
+
+class TestDeck(unittest.TestCase):
+
+    def test_deals_every_card_once(self):
+        deck = Deck(random.Random(4))
+        for _ in range(3):
+            dealt = [deck.deal() for _ in range(52)]
+            self.assertEqual(sorted(card.index for card in dealt), list(range(52)))
+            with self.assertRaises(ValueError):
+                deck.deal()
+            deck.reset()
+            self.assertEqual(len(deck.cards), 52)
+
+
+    def test_remove(self):
+        deck = Deck(random.Random(5))
+        for _ in range(20):
+            deck.deal()
+        gone = set(range(52)) - {card.index for card in deck.cards}
+
+        for code in [0, 17, 51]:
+            if code in gone:
+                continue
+            deck.remove(CARDS[code])
+            gone.add(code)
+            self.assertNotIn(CARDS[code], deck.cards)
+        with self.assertRaises(ValueError):
+            deck.remove(CARDS[min(gone)])
+
+        # the rest deals without any removed card.
+        rest = [deck.deal_code() for _ in range(52 - len(gone))]
+        self.assertEqual(sorted(rest + list(gone)), list(range(52)))
+
+        deck.reset()
+        deck.remove(CARDS[min(gone)])
+        self.assertEqual(len(deck.cards), 51)
+
+
+# ----------------------------------------------------------------------------
+
+
+class TestCards(unittest.TestCase):
+
+    def test_immutable(self):
+        card = CARDS[0]
+        with self.assertRaises(AttributeError):
+            card.power = 20
+        with self.assertRaises(AttributeError):
+            del card.power
+        self.assertEqual(card.power, 2)
+
+
+    def test_interned(self):
+        for card in CARDS:
+            self.assertIs(Cards(card.value, card.symbol), card)
+            self.assertIs(pickle.loads(pickle.dumps(card)), card)
+
+
+    def test_compare(self):
+        self.assertLess(CARDS[0], CARDS[51])
+        self.assertLessEqual(CARDS[0], CARDS[1])
+        self.assertNotEqual(CARDS[0], 0)
+        with self.assertRaises(TypeError):
+            CARDS[5] < 3
+
+
+# ----------------------------------------------------------------------------
+
+
+class TestDataset(unittest.TestCase):
+
+    def setUp(self):
+        self.folder = tempfile.TemporaryDirectory()
+        self.addCleanup(self.folder.cleanup)
+        self.path = os.path.join(self.folder.name, "deals.bin")
+
+
+    def test_round_trip(self):
+        rng = random.Random(3)
+        deals = [game.game(rng.randint(2, 9), rng=rng) for _ in range(300)]
+        with DealWriter(self.path, chunk_size=64) as writer:
+            for board, hands in deals:
+                writer.add(board, hands)
+
+        with DealReader(self.path) as reader:
+            read = [[column.tolist() for column in deal] for deal in reader]
+        self.assertEqual(len(read), len(deals))
+
+        for (board, hands), (codes, holes, results, strengths, winners) in zip(deals, read):
+            cards = [card.index for card in board.cards]
+            self.assertEqual(codes, cards)
+            self.assertEqual(holes, [[card.index for card in hand] for hand in hands])
+
+            values = [strength(cards + [card.index for card in hand]) for hand in hands]
+            self.assertEqual(strengths, values)
+            self.assertEqual(results, [category(value).value for value in values])
+            self.assertEqual(winners, [value == max(values) for value in values])
+
+
+    def test_empty_file(self):
+        DealWriter(self.path).close()
+        with DealReader(self.path) as reader:
+            self.assertEqual(len(reader), 0)
+            self.assertEqual(list(reader.chunks()), [])
+            self.assertEqual(list(reader), [])
+
+        record(self.path, 0)
+        with DealReader(self.path) as reader:
+            self.assertEqual(len(reader), 0)
+
+
+    def test_cut_off_chunk(self):
+        record(self.path, 100, players=6, chunk_size=40, seed=1)
+        size = os.path.getsize(self.path)
+        for cut in (50, size - 3):
+            with open(self.path, "r+b") as f:
+                f.truncate(size - cut)
+            with self.assertRaises(ValueError) as e:
+                DealReader(self.path)
+            self.assertIn(self.path, str(e.exception))
+
+
+# ----------------------------------------------------------------------------
+
+
+class TestShowdown(unittest.TestCase):
+
+    def test_order_and_groups(self):
+        rng = random.Random(6)
+        for _ in range(300):
+            (board, hands) = game.game(rng.randint(2, 12), rng=rng)
+            res = showdown(board, hands)
+            codes = [card.index for card in board.cards]
+            references = [best(codes + [card.index for card in hand]) for hand in hands]
+
+            self.assertEqual(sorted(res.order), list(range(len(hands))))
+            self.assertEqual([seat for group in res.groups for seat in group], res.order)
+            for group in res.groups:
+                self.assertEqual(len({references[seat] for seat in group}), 1)
+            tops = [references[group[0]] for group in res.groups]
+            self.assertEqual(tops, sorted(tops, reverse=True))
+
+            self.assertEqual(sorted(res.groups[0]), res.winners)
+            self.assertEqual(winners(board, hands), res.winners)
+            self.assertIsNone(showdown(board, hands, full=False).order)
+
+
+    def test_board_plays(self):
+        board = make_board("AsKsQsJsTs")
+        hands = [hand("2h3h"), hand("4d5d"), hand("9s8s")]
+        res = showdown(board, hands)
+        self.assertEqual(res.winners, [0, 1, 2])
+        self.assertEqual(res.groups, [[0, 1, 2]])
+        self.assertEqual(res.result(0), Result.RoyalFlush)
+
+
+# ----------------------------------------------------------------------------
+
+
+class TestRanges(unittest.TestCase):
+
+    def test_parse(self):
+        self.assertEqual(len(Range("AA")), 6)
+        self.assertEqual(len(Range("AKs")), 4)
+        self.assertEqual(len(Range("AKo")), 12)
+        self.assertEqual(len(Range("AA, KK, AKs:0.5")), 16)
+        self.assertEqual(Range("AKs:0.5").combos()[0][2], 0.5)
+
+
+    def test_against_every_runout(self):
+        board = "2h7d9cTs"
+        hero = Range("AA, KQs, 98s")
+        villain = Range("TT, JJ, AKo:0.5")
+
+        shown = parse_cards(board)
+        share = 0.0
+        total = 0.0
+        for a, b, first in hero.combos():
+            for c, d, second in villain.combos():
+                codes = [a, b, c, d]
+                if len(set(codes + shown)) != len(codes) + len(shown):
+                    continue
+                weight = first * second
+                (equity, _) = brute_equity([(CARDS[a], CARDS[b]), (CARDS[c], CARDS[d])], shown)
+                share += weight * equity
+                total += weight
+
+        self.assertAlmostEqual(range_equity(hero, villain, make_board(board)), share / total, places=9)
+
+
+# ----------------------------------------------------------------------------
+
+
+class TestBoardCache(unittest.TestCase):
+
+    def setUp(self):
+        for cache in (combos.BOARDS, combos.EXACT):
+            cache.clear()
+        combos.SEEN.clear()
+
+
+    def test_renamed_suits(self):
+        rng = random.Random(8)
+        for _ in range(40):
+            board = rng.sample(range(52), 5)
+            perm = rng.choice(PERMUTATIONS)
+            renamed = permute(board, perm)
+
+            # the second board comes from the first one's cache entry.
+            first = combos.board_strengths(board)
+            second = combos.board_strengths(renamed)
+            self.assertTrue(np.array_equal(first, combos.compute_strengths(board)))
+            self.assertTrue(np.array_equal(second, combos.compute_strengths(renamed)))
+
+        for index, (a, b) in enumerate(COMBOS.tolist()):
+            expected = 0 if a in renamed or b in renamed else strength(renamed + [a, b])
+            self.assertEqual(int(second[index]), expected)
+
+
+    def test_dead_cards(self):
+        board = [0, 9, 22, 35, 48]
+        strengths = combos.board_strengths(board, dead=[51])
+        self.assertEqual(int(strengths[COMBO_INDEX[51, 1]]), 0)
+        self.assertEqual(int(strengths[COMBO_INDEX[0, 1]]), 0)
+        self.assertGreater(int(strengths[COMBO_INDEX[2, 1]]), 0)
+        self.assertGreater(int(combos.board_strengths(board)[COMBO_INDEX[51, 1]]), 0)
+
+
+    def test_cached_on_second_sight(self):
+        board = [3, 14, 25, 36, 47]
+        self.assertIsNone(combos.cached_strengths(board))
+        cached = combos.cached_strengths(board)
+        self.assertTrue(np.array_equal(cached, combos.compute_strengths(board)))
+        self.assertIs(combos.cached_strengths(list(reversed(board))), cached)
+        self.assertIsNone(combos.cached_strengths(board[:4]))
+
+
+# ----------------------------------------------------------------------------
+
+
+class TestCanon(unittest.TestCase):
+
+    def test_board_classes(self):
+        flops = canonical_flops()
+        self.assertEqual(len(flops), 1755)
+        self.assertEqual(sum(flops.values()), 22100)
+
+
+    def test_renamed_situation(self):
+        rng = random.Random(9)
+        for _ in range(200):
+            codes = rng.sample(range(52), 9)
+            (board, hands) = (codes[:5], [codes[5:7], codes[7:9]])
+            perm = rng.choice(PERMUTATIONS)
+            renamed = canonical_codes(permute(board, perm), [permute(cards, perm) for cards in hands])
+            (shown, hole, _, back) = canonical_codes(board, hands)
+            self.assertEqual(renamed[:2], (shown, hole))
+            self.assertEqual(sorted(restore(list(shown), back)), sorted(board))
+
+
+    def test_equity_of_renamed_hands(self):
+        first = exact_equity([hand("AhKh"), hand("QsQd")], make_board("2h7h9c"))
+        second = exact_equity([hand("AsKs"), hand("QhQc")], make_board("2s7s9d"))
+        self.assertEqual([equity.equity for equity in first], [equity.equity for equity in second])
+
+
+    def test_cached_results_are_immutable(self):
+        cards = [hand("AhKd"), hand("QsQc")]
+        first = exact_equity(cards, make_board("2h7d9c"))
+        with self.assertRaises(AttributeError):
+            first[0].equity = 1.0
+        with self.assertRaises(AttributeError):
+            del first[0].equity
+        self.assertEqual(exact_equity(cards, make_board("2h7d9c"))[0].equity, first[0].equity)
+        self.assertEqual(pickle.loads(pickle.dumps(first[0])).equity, first[0].equity)
+
+
+# ----------------------------------------------------------------------------
+
+
+class TestDealGames(unittest.TestCase):
+
+    def test_shuffle_prefix(self):
+        rng = np.random.default_rng(10)
+        deck = np.array([code for code in range(52) if code % 5], dtype=np.int16)
+        cards = shuffle_prefix(deck, 20000, 7, rng)
+        self.assertEqual(cards.shape, (20000, 7))
+        self.assertTrue(np.isin(cards, deck).all())
+        self.assertTrue((np.sort(cards, axis=1)[:, 1:] != np.sort(cards, axis=1)[:, :-1]).all())
+
+        # every card turns up about equally often in every place.
+        expected = 20000 / len(deck)
+        for place in (0, 6):
+            counts = np.bincount(cards[:, place], minlength=52)[deck]
+            self.assertLess(np.abs(counts - expected).max(), 5 * np.sqrt(expected))
+
+
+    def test_deals(self):
+        rng = np.random.default_rng(11)
+        games = DEAL_BLOCK + 100
+        (boards, holes) = deal_games(games, MAX_PLAYERS, rng)
+        self.assertEqual(boards.shape, (games, 5))
+        self.assertEqual(holes.shape, (games, MAX_PLAYERS, 2))
+
+        cards = np.sort(np.concatenate((boards, holes.reshape(games, -1)), axis=1), axis=1)
+        self.assertTrue((cards[:, 1:] != cards[:, :-1]).all())
+        self.assertTrue(((0 <= cards) & (cards < 52)).all())
+
+
+    def test_strengths(self):
+        (boards, holes) = deal_games(200, 6, np.random.default_rng(12))
+        strengths = deal_strengths(boards, holes)
+        for board, hole, row in zip(boards.tolist(), holes.tolist(), strengths.tolist()):
+            self.assertEqual(row, [strength(board + cards) for cards in hole])
+
+
+# ----------------------------------------------------------------------------
+
+
+class TestEstimate(unittest.TestCase):
+
+    def test_stops_at_precision(self):
+        res = estimate(hand("AhAd"), 2, precision=0.005, seed=13, workers=1)
+        self.assertTrue(res.converged)
+        self.assertLessEqual(res.interval(), 0.005)
+        self.assertEqual(res.games % BATCH, 0)
+
+        # one batch less would not have been enough.
+        shorter = estimate(hand("AhAd"), 2, precision=0.005, max_games=res.games - BATCH, seed=13, workers=1)
+        self.assertFalse(shorter.converged)
+        self.assertGreater(shorter.interval(), 0.005)
+
+
+    def test_max_games(self):
+        for workers in (1, 2):
+            res = estimate(hand("7h2d"), 4, precision=1e-6, max_games=12345, seed=14, workers=workers)
+            self.assertEqual(res.games, 12345)
+            self.assertFalse(res.converged)
+        self.assertEqual(res.equity, estimate(hand("7h2d"), 4, precision=1e-6, max_games=12345, seed=14, workers=1).equity)
+
+
+    def test_checks_arguments(self):
+        for players in (1, MAX_PLAYERS + 1):
+            with self.assertRaises(ValueError):
+                estimate(hand("AhAd"), players, workers=1)
+        with self.assertRaises(ValueError):
+            estimate(hand("AhAd"), 2, precision=0, workers=1)
+        with self.assertRaises(ValueError):
+            estimate(hand("AhAd"), 2, confidence=1.0, workers=1)
+
+
+# ----------------------------------------------------------------------------
+
+
+class TestInstrument(unittest.TestCase):
+
+    def functions(self) -> dict:
+        """
+        Every stage function as the modules and classes see it right now.
+        """
+        res = {}
+        for name, (module_name, attribute) in instrument.STAGES.items():
+            owner = importlib.import_module(module_name)
+            if "." in attribute:
+                (cls, method) = attribute.split(".")
+                res[name] = vars(getattr(owner, cls))[method]
+                continue
+            for module in list(sys.modules.values()):
+                if hasattr(module, attribute):
+                    res[(module.__name__, attribute)] = getattr(module, attribute)
+        return res
+
+
+    def test_enable_and_disable(self):
+        before = self.functions()
+        with instrument.profiling() as profile:
+            during = self.functions()
+            simulate(200, players=6, workers=1, seed=15)
+            (board, hands) = game.game(3)
+            game.evaluate(board, hands[0])
+
+        # the stages and every copy imported by name are wrapped, nothing else.
+        for name, (module_name, attribute) in instrument.STAGES.items():
+            key = name if "." in attribute else (module_name, attribute)
+            self.assertIs(during[key].__wrapped__, before[key])
+        for key, function in before.items():
+            self.assertTrue(during[key] is function or during[key].__wrapped__ is function)
+        self.assertEqual(self.functions(), before)
+
+        self.assertEqual(profile.calls["game"], 201)
+        self.assertEqual(profile.calls["showdown"], 200)
+        self.assertEqual(profile.calls["evaluate"], 1)
+        self.assertEqual(sum(profile.results.values()), 6 * 200 + 1)
+
+
+# ----------------------------------------------------------------------------
+
+
+class TestLegacy(unittest.TestCase):
+
+    def test_same_result_as_the_tables(self):
+        rng = random.Random(5)
+        for _ in range(30000):
+            codes = rng.sample(range(52), 7)
+            board = Board([CARDS[code] for code in codes[:3]])
+            board.run(CARDS[codes[3]])
+            board.run(CARDS[codes[4]])
+            (result, _) = game.legacy_evaluate(board, (CARDS[codes[5]], CARDS[codes[6]]))
+            self.assertEqual(result, category(strength(codes)))
+
+
+    def test_straight_and_flush(self):
+        rng = random.Random(16)
+        for _ in range(5000):
+            cards = [CARDS[code] for code in rng.sample(range(52), 7)]
+            ranks = {card.index >> 2 for card in cards}
+
+            highs = [high for high in range(12, 3, -1) if all(rank in ranks for rank in range(high - 4, high + 1))]
+            if not highs and {12, 0, 1, 2, 3} <= ranks:
+                highs = [3]
+            straight = game.check_straight(cards)
+            if highs:
+                self.assertEqual(straight[-1].index >> 2, highs[0])
+                self.assertEqual(len({card.index >> 2 for card in straight}), 5)
+            else:
+                self.assertEqual(straight, [])
+
+            suits = [[card for card in cards if card.index & 3 == suit] for suit in range(4)]
+            suited = max(suits, key=len)
+            expected = sorted(suited)[-5:] if len(suited) >= 5 else []
+            self.assertEqual(game.check_flush(cards), expected)
+
+        wheel = [CARDS[code] for code in parse_cards("Ah2s3d4c5h9sJd")]
+        self.assertEqual([card.power for card in game.check_straight(wheel)], [14, 2, 3, 4, 5])
+
+
+# ----------------------------------------------------------------------------
+
+
+class TestService(unittest.TestCase):
+
+    def test_showdowns(self):
+        requests = [
+            {"op": "showdown", "hands": ["AhKd", "QsQc", "7s7c"], "board": "2h7d9cTsJs"},
+            {"op": "showdown", "hands": ["AsKs", "AcKc"], "board": "2h7d9cTsJh"},
+        ]
+        replies = service.run_batch(requests)
+        for request, reply in zip(requests, replies):
+            board = parse_cards(request["board"])
+            values = [strength(board + parse_cards(cards)) for cards in request["hands"]]
+            self.assertEqual(reply["strengths"], values)
+            self.assertEqual(reply["categories"], [category(value).value for value in values])
+            self.assertEqual(reply["winners"], [seat for seat, value in enumerate(values) if value == max(values)])
+
+
+    def test_broken_requests_only_fail_themselves(self):
+        good = {"op": "showdown", "hands": ["AhKd", "QsQc"], "board": "2h7d9cTsJs"}
+        broken = [
+            {"op": "showdown", "hands": ["AhKd", "QsQc"], "board": 5},
+            {"op": "showdown", "hands": "AhKdQsQc", "board": "2h7d9cTsJs"},
+            {"op": "showdown", "hands": ["AhKd", 5], "board": "2h7d9cTsJs"},
+            {"op": "showdown", "hands": [], "board": "2h7d9cTsJs"},
+            {"op": "showdown", "hands": ["AhKd"], "board": "2h7d9cTsJs"},
+            {"op": "showdown", "hands": ["AhAh", "QsQc"], "board": "2h7d9cTsJs"},
+            {"op": "showdown", "hands": ["AhKd", "QsQc"], "board": "2h7d9c"},
+            {"op": "equity", "hands": ["AhKd", "AhQc"]},
+            {"op": "equity", "hands": ["AhKd", "QsQc"], "board": ["2h"]},
+            {"op": "estimate", "hand": "AhKd", "players": 1},
+            {"op": "estimate", "hand": "AhKd", "players": 30},
+            {"op": "estimate", "hand": "AhKd", "players": "6"},
+            {"op": "estimate", "hand": 5, "players": 6},
+            {"op": "nothing"},
+        ]
+        replies = service.run_batch([good] + broken + [good])
+        self.assertEqual(replies[0], replies[-1])
+        self.assertEqual(replies[0]["winners"], [1])
+        for reply in replies[1:-1]:
+            self.assertIn("error", reply)
+            self.assertNotIn("Error", reply["error"])
+
+        # alone, the showdowns that no other one can take down.
+        for request in broken[:4]:
+            self.assertIn("error", service.run_batch([request])[0])
+
+
+    def test_connection(self):
+        async def run(path: str) -> tuple:
+            server = service.Service(workers=1, timeout=0.05)
+            await server.start(path=path)
+            try:
+                client = await service.Client.connect(path=path)
+                equity = await client.equity(["AhKd", "QsQc"], board="2h7d9c")
+                showdown = await client.showdown(["AhKd", "QsQc"], board="2h7d9cTsJs")
+
+                # a longer timeout than the service allows is cut to its own.
+                try:
+                    await client.request("estimate", hand="AhKd", players=2, precision=0, timeout=1e9)
+                    late = None
+                except ValueError as e:
+                    late = str(e)
+
+                (reader, writer) = await asyncio.open_unix_connection(path)
+                writer.write(b"[1, 2]\n{bad\n")
+                raw = [json.loads(await reader.readline()) for _ in range(2)]
+                writer.close()
+                await client.close()
+            finally:
+                await server.close()
+            return (equity, showdown, late, raw)
+
+        with tempfile.TemporaryDirectory() as folder:
+            (equity, showdown, late, raw) = asyncio.run(run(os.path.join(folder, "service.sock")))
+
+        expected = exact_equity([hand("AhKd"), hand("QsQc")], make_board("2h7d9c"))
+        self.assertEqual([seat["equity"] for seat in equity], [seat.equity for seat in expected])
+        self.assertEqual(showdown["winners"], [1])
+        self.assertEqual(late, "timeout")
+        self.assertEqual([reply["id"] for reply in raw], [None, None])
+        self.assertTrue(all("error" in reply for reply in raw))
+
+
+# ----------------------------------------------------------------------------
+
+
+class TestMultiway(unittest.TestCase):
+
+    def test_against_exact(self):
+        trials = 100000
+        for (board, hands) in [
+            ("2h7d9c", ["AhKd", "QsQc"]),
+            ("", ["AhKd", "QsQc"]),
+            ("Ts9s2d", ["AsKs", "JhTh", "8c7c"]),
+            ("5h5d5c", ["5sAh", "KdKc", "KhQh"]),
+        ]:
+            cards = [hand(text) for text in hands]
+            shown = make_board(board) if board else None
+            result = multiway_equity(cards, 0, shown, trials=trials, seed=17)
+            expected = exact_equity(cards, shown)
+            self.assertAlmostEqual(sum(seat.equity for seat in result), 1.0, places=9)
+
+            for seat, exact in zip(result, expected):
+                error = 4 * np.sqrt(exact.equity * (1 - exact.equity) / trials) + 1e-9
+                self.assertLess(abs(seat.equity - exact.equity), error)
+                self.assertLess(abs(seat.win - exact.win), 4 * np.sqrt(exact.win * (1 - exact.win) / trials) + 1e-9)
+                self.assertLess(abs(seat.tie - exact.tie), 4 * np.sqrt(exact.tie * (1 - exact.tie) / trials) + 1e-9)
+
+
+    def test_full_table(self):
+        result = multiway_equity([hand("AhAd")], 21, trials=20000, seed=18)
+        self.assertEqual(len(result), 22)
+        self.assertAlmostEqual(sum(seat.equity for seat in result), 1.0, places=9)
+
+        # the opponents are all random hands, aces are far above them.
+        opponents = [seat.equity for seat in result[1:]]
+        self.assertGreater(result[0].equity, 2 * max(opponents))
+        self.assertLess(max(opponents) - min(opponents), 0.02)
+        self.assertEqual(multiway_equity([hand("AhAd")], 3, trials=5000, seed=19)[0].equity,
+                         multiway_equity([hand("AhAd")], 3, trials=5000, seed=19)[0].equity)
+
+
+# ----------------------------------------------------------------------------
+
+
+class TestJobs(unittest.TestCase):
+
+    GAMES = 30000
+    PLAYERS = [2]
+
+    @classmethod
+    def setUpClass(cls):
+        with tempfile.TemporaryDirectory() as folder:
+            job = jobs.Job(os.path.join(folder, "full.json"), cls.GAMES, cls.PLAYERS, seed=5)
+            job.run(workers=1)
+        cls.reference = job.stats
+
+
+    def setUp(self):
+        self.folder = tempfile.TemporaryDirectory()
+        self.addCleanup(self.folder.cleanup)
+
+
+    def path(self, name: str) -> str:
+        return os.path.join(self.folder.name, name)
+
+
+    def test_resume_after_a_crash(self):
+        calls = []
+
+        def crashing(*args):
+            calls.append(args)
+            if len(calls) == 3:
+                raise KeyboardInterrupt
+            return run_shard(*args)
+
+        with mock.patch.object(jobs, "run_shard", crashing):
+            with self.assertRaises(KeyboardInterrupt):
+                jobs.Job(self.path("crash.json"), self.GAMES, self.PLAYERS, seed=5).run(workers=1, every=0.0)
+
+        job = jobs.Job(self.path("crash.json"), self.GAMES, self.PLAYERS)
+        self.assertEqual(job.seed, 5)
+        self.assertEqual(len(job.done[2]), 2)
+        self.assertFalse(job.finished())
+        job.run(workers=1)
+
+        for count in self.PLAYERS:
+            self.assertEqual(job.stats[count].by_hand, self.reference[count].by_hand)
+            self.assertEqual(job.stats[count].by_result, self.reference[count].by_result)
+            self.assertEqual(job.stats[count].games, self.GAMES)
+
+
+    def test_shards_merge_to_the_full_run(self):
+        paths = [self.path(f"shard{i}.json") for i in range(2)]
+        for i, path in enumerate(paths):
+            jobs.Job(path, self.GAMES, self.PLAYERS, seed=5, shard=i, shards=2).run(workers=1)
+
+        merged = jobs.merge(paths, self.path("merged.json"))
+        for count in self.PLAYERS:
+            self.assertEqual(merged[count].by_hand, self.reference[count].by_hand)
+            self.assertEqual(merged[count].by_result, self.reference[count].by_result)
+            self.assertEqual(merged[count].games, self.GAMES)
+
+        # the same batches twice would count games twice.
+        with self.assertRaises(ValueError):
+            jobs.merge([paths[0], self.path("merged.json")], self.path("twice.json"))
+
+
+    def test_other_job(self):
+        jobs.Job(self.path("job.json"), 100, self.PLAYERS, seed=5).run(workers=1)
+        with self.assertRaises(ValueError):
+            jobs.Job(self.path("job.json"), 200, self.PLAYERS)
+        with self.assertRaises(ValueError):
+            jobs.Job(self.path("job.json"), 100, self.PLAYERS, seed=6)
+
+
+# ----------------------------------------------------------------------------
+
+
+class TestReplay(unittest.TestCase):
+
+    def test_same_stats_as_play(self):
+        rng = random.Random(20)
+        deals = [game.game(rng.randint(2, 9), rng=rng) for _ in range(2000)]
+        deals.append((make_board("AsKsQsJsTs"), [hand("2h3h"), hand("4d5d")]))
+
+        expected = Stats()
+        with mock.patch("simulate.game", side_effect=deals):
+            for board, hands in deals:
+                play(len(hands), expected)
+
+        lines = ["# board, then every hand", ""]
+        for board, hands in deals:
+            cards = "".join(card_text(card.index) for card in board.cards)
+            lines.append(" ".join([cards] + ["".join(card_text(card.index) for card in cards) for cards in hands]))
+
+        with mock.patch("replay.BATCH_ROWS", 500):
+            stats = replay(lines)
+
+        self.assertEqual(stats.games, expected.games)
+        self.assertEqual(stats.by_hand, expected.by_hand)
+        self.assertEqual(stats.by_result, expected.by_result)
+        self.assertEqual(stats.pots.keys(), expected.pots.keys())
+        for name, share in expected.pots.items():
+            self.assertAlmostEqual(stats.pots[name], share, places=6)
+
+
+    def test_bad_lines(self):
+        for line in ["2h7d9cTsJs AhKd", "2h7d9cTs AhKd QsQc", "2h7d9cTsJs AhKd QsQ", "2h7d9cTsJs AhKd Ah2c", "2h7d9cTsJs AhKd Xx2c"]:
+            with self.assertRaises(ValueError) as e:
+                replay(["", line])
+            self.assertTrue(str(e.exception).startswith("Line 2:"))
+
+
+# ----------------------------------------------------------------------------
+
+
+class TestEvaluation(unittest.TestCase):
+
+    def test_best_cards(self):
+        rng = random.Random(21)
+        seen = set()
+        for _ in range(5000):
+            codes = rng.sample(range(52), 7)
+            res = Evaluation(strength(codes), tuple(codes))
+            self.assertIsNone(res.best)
+            (cards, kickers) = res.cards()
+            picked = [card.index for card in cards + kickers]
+            seen.add(res.category)
+
+            # five of the seven cards, and they make the best hand.
+            self.assertEqual(len(set(picked)), 5)
+            self.assertLessEqual(set(picked), set(codes))
+            self.assertEqual(five(picked), best(codes))
+            self.assertEqual(best_cards([CARDS[code] for code in codes], res.strength), (cards, kickers))
+            if res.category not in (Result.Straight, Result.StraightFlush):
+                self.assertEqual([card.power for card in kickers], sorted((card.power for card in kickers), reverse=True))
+        self.assertGreaterEqual(len(seen), 8)
+
+
+    def test_board_changes_later(self):
+        board = make_board("2h7d9c")
+        res = evaluate(board, hand("AhKd"))
+        board.run(CARDS[parse_cards("Ac")[0]])
+        self.assertEqual(res.category, Result.HighCard)
+        self.assertEqual([card.power for card in res.eval_cards], [14, 13, 9, 7, 2])
+        self.assertEqual(res.rest_cards, [])
+
+
+    def test_unpack_and_compare(self):
+        board = make_board("2h7d9cTsJs")
+        (pair, straight) = (evaluate(board, hand("2c3c")), evaluate(board, hand("8h3d")))
+        (result, (cards, kickers)) = pair
+        self.assertEqual(result, Result.Pair)
+        self.assertEqual(pair[0], Result.Pair)
+        self.assertEqual(pair[1], (cards, kickers))
+        self.assertTrue(pair < straight and pair <= straight and straight > pair and straight >= pair)
+        self.assertEqual(pair, evaluate(board, hand("2d3d")))
+        self.assertNotEqual(pair, Result.Pair)
+
+        res = showdown(board, [hand("2c3c"), hand("8h3d")])
+        self.assertEqual(res.evaluation(1).cards(), straight.cards())
+
+
+if __name__ == "__main__":
+    unittest.main()